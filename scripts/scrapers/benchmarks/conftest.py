@@ -0,0 +1,168 @@
+# scripts/scrapers/benchmarks/conftest.py
+#
+# オフラインのパース性能ベンチマーク用の共通設定
+#  - fixtures/<スクリプト名>.html を各スクレイパーの parse_events() に通し、
+#    所要時間（中央値）とピークメモリ（tracemalloc）を測る
+#  - fixtures/*.html は実サイトから取得したページではなく、各館のセレクタ・日付表記に合わせて生成した合成ページ
+#    （本文とナビゲーションは全館共通の水増し用の文。件数と構造を大きくしてパース量を本番並みにするためのもの）
+#    パーサーの速さ・メモリ・キャッシュの整合は測れるが、実ページでの抽出結果が正しいこと、
+#    書き換え前後で実ページの結果が同じことの根拠にはならない
+#    実ページで確かめるときは page_archive の記録を reprocess --dry-run で読み直す
+#  - 各スクレイパーを新しいプロセスで import する時間と、読み込まれる重い依存も測る
+#  - budgets.json の上限を超えたらテストを失敗させる
+#    （CI の速さに合わせて --bench-scale / SCRAPER_BENCH_BUDGET_SCALE で上限を何倍かにできる）
+#  - ネットワーク接続はすべて失敗させ、実サイトには一切アクセスしない
+
+import contextlib
+import io
+import json
+import os
+import socket
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import date
+
+import pytest
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE_DIR = os.path.abspath(os.path.join(BENCH_DIR, "..", "..", ".."))
+FIXTURE_DIR = os.path.join(BENCH_DIR, "fixtures")
+BUDGETS_PATH = os.path.join(BENCH_DIR, "budgets.json")
+# 合成フィクスチャの日付はこの日を基準に年を推測する
+REFERENCE_DATE = date(2025, 6, 1)
+
+if BASE_DIR not in sys.path:
+    sys.path.append(BASE_DIR)
+
+_results = []
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("scraper benchmarks")
+    group.addoption("--bench-rounds", type=int, default=int(os.getenv("SCRAPER_BENCH_ROUNDS", "5")),
+                    help="1 ケースあたりの計測回数（中央値を予算と比べる）")
+    group.addoption("--bench-scale", type=float, default=float(os.getenv("SCRAPER_BENCH_BUDGET_SCALE", "1")),
+                    help="budgets.json の上限に掛ける倍率")
+    group.addoption("--bench-json", default=os.getenv("SCRAPER_BENCH_JSON"),
+                    help="計測結果を JSON で書き出すパス")
+
+
+def load_budgets():
+    with open(BUDGETS_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURE_DIR, name + ".html"), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def reset_caches():
+    # 本番は 1 プロセス 1 回のパースなので、毎回キャッシュが空の状態で測る
+    from src.lib import date_parser, text_utils
+    date_parser._parse.cache_clear()
+    text_utils._clean_cached.cache_clear()
+
+
+@pytest.fixture(autouse=True)
+def no_network(monkeypatch):
+    def refuse(*args, **kwargs):
+        raise RuntimeError("ベンチマーク中のネットワーク接続は禁止")
+    monkeypatch.setattr(socket.socket, "connect", refuse)
+    monkeypatch.setattr(socket, "create_connection", refuse)
+
+
+@pytest.fixture(autouse=True)
+def fixed_reference_date():
+    from src.lib import date_parser
+    previous = date_parser._reference
+    date_parser.set_reference_date(REFERENCE_DATE)
+    yield
+    date_parser.set_reference_date(previous)
+
+
+class Benchmark:
+    def __init__(self, config):
+        self.rounds = max(1, config.getoption("--bench-rounds"))
+        self.scale = config.getoption("--bench-scale")
+        self.budgets = load_budgets()
+
+    def budget(self, name, section="parse"):
+        budgets = self.budgets.get(section, {})
+        budget = dict(budgets.get("default", {}))
+        budget.update(budgets.get(name, {}))
+        return budget
+
+    def measure(self, name, func, *args):
+        """func(*args) の所要時間とピークメモリを測り、予算を超えていれば失敗させる"""
+        sink = io.StringIO()
+        timings = []
+        for _ in range(self.rounds):
+            reset_caches()
+            with contextlib.redirect_stdout(sink):
+                started = time.perf_counter()
+                result = func(*args)
+                timings.append((time.perf_counter() - started) * 1000)
+            sink.seek(0)
+            sink.truncate()
+
+        # メモリは時間計測とは別の 1 回で測る（tracemalloc 自体が遅いため）
+        reset_caches()
+        tracemalloc.start()
+        try:
+            with contextlib.redirect_stdout(sink):
+                func(*args)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        self.report(name, timings, peak / 1024, self.budget(name))
+        return result
+
+    def report(self, name, timings, peak_kib=None, budget=None):
+        """計測結果を記録し、予算（time_ms / peak_kib）を超えていれば失敗させる"""
+        budget = budget or {}
+        record = {
+            "name": name,
+            "rounds": len(timings),
+            "median_ms": round(statistics.median(timings), 3),
+            "min_ms": round(min(timings), 3),
+            "peak_kib": None if peak_kib is None else round(peak_kib, 1),
+            "budget_ms": budget.get("time_ms"),
+            "budget_kib": budget.get("peak_kib"),
+            "scale": self.scale,
+        }
+        _results.append(record)
+
+        over = []
+        if budget.get("time_ms") is not None and record["median_ms"] > budget["time_ms"] * self.scale:
+            over.append(f"時間 {record['median_ms']}ms > {budget['time_ms'] * self.scale:g}ms")
+        if (budget.get("peak_kib") is not None and record["peak_kib"] is not None
+                and record["peak_kib"] > budget["peak_kib"] * self.scale):
+            over.append(f"メモリ {record['peak_kib']}KiB > {budget['peak_kib'] * self.scale:g}KiB")
+        if over:
+            pytest.fail(f"{name}: 予算超過（" + "、".join(over) + "）")
+
+
+@pytest.fixture
+def bench(request):
+    return Benchmark(request.config)
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    if not _results:
+        return
+    terminalreporter.section("scraper benchmarks")
+    terminalreporter.write_line(f"{'name':<36}{'median ms':>11}{'min ms':>10}{'peak KiB':>10}{'budget':>18}")
+    for r in _results:
+        budget = f"{r['budget_ms']}ms" + (f"/{r['budget_kib']}KiB" if r["budget_kib"] else "")
+        peak = "-" if r["peak_kib"] is None else f"{r['peak_kib']:.1f}"
+        terminalreporter.write_line(
+            f"{r['name']:<36}{r['median_ms']:>11.2f}{r['min_ms']:>10.2f}{peak:>10}{budget:>18}"
+        )
+    path = config.getoption("--bench-json")
+    if path:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(_results, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,159 @@
+# scripts/scrapers/benchmarks/test_date_parser.py
+#
+# 共通の日付パーサー（src/lib/date_parser.py）の表記ごとの結果と、
+# 以前の各スクレイパーの「呼ぶたびに正規表現で探す」方式との速さの比較
+#   python -m pytest scripts/scrapers/benchmarks/test_date_parser.py -q
+
+import re
+from datetime import date, datetime
+
+import conftest
+import pytest
+
+from src.lib import date_parser
+from src.lib.date_parser import parse_date, parse_date_range, reference_date, set_reference_date, year_epoch
+
+# conftest の基準日（2025-06-01）で年を推測する
+CASES = [
+    # 年あり
+    ("2025年5月3日", ("2025/05/03", "2025/05/03")),
+    ("2025/5/3～2025/6/1", ("2025/05/03", "2025/06/01")),
+    ("2025-05-03", ("2025/05/03", "2025/05/03")),
+    # 和暦・元年
+    ("令和7年5月3日", ("2025/05/03", "2025/05/03")),
+    ("令和元年5月1日～令和2年1月5日", ("2019/05/01", "2020/01/05")),
+    ("平成31年4月30日", ("2019/04/30", "2019/04/30")),
+    ("平成元年1月8日", ("1989/01/08", "1989/01/08")),
+    # 年をまたぐ範囲（後半は前の日付の年を引き継ぎ、10〜12 月から 1〜3 月に戻れば翌年）
+    ("12/20～1/10", ("2025/12/20", "2026/01/10")),
+    ("2025年12月27日～1月4日", ("2025/12/27", "2026/01/04")),
+    # 月を省いた範囲の終わり
+    ("5月3日～6日", ("2025/05/03", "2025/05/06")),
+    ("5月3日・4日", ("2025/05/03", "2025/05/04")),
+    # 曜日・祝日の括弧
+    ("5月3日(土)～6日(火)", ("2025/05/03", "2025/05/06")),
+    ("5月3日（土・祝）～5月5日（月・祝）", ("2025/05/03", "2025/05/05")),
+    ("2025年6月1日（月）10:00〜12:00", ("2025/06/01", "2025/06/01")),
+    # 全角の数字・記号
+    ("２０２５年５月３日～５月６日", ("2025/05/03", "2025/05/06")),
+    ("５／３（土）", ("2025/05/03", "2025/05/03")),
+    # 別々の日付の列挙は、最初から最後までの 1 つの期間にする（events は開始日・終了日しか持たない）
+    ("5月3日、10日、17日、24日", ("2025/05/03", "2025/05/24")),
+    ("6/7・6/14・6/21", ("2025/06/07", "2025/06/21")),
+    # 区切りでつながっていない後ろの日付は注記なので、期間に含めない
+    ("7月20日(日)～8月31日(日) 8月11日(月・祝)は開館", ("2025/07/20", "2025/08/31")),
+    ("5月3日～6月1日 ※5月5日は休館", ("2025/05/03", "2025/06/01")),
+    # 日付がない・存在しない日付
+    ("日程未定", (None, None)),
+    ("3日・4日", (None, None)),
+    ("2月30日～3月1日", ("2025/03/01", "2025/03/01")),
+    ("", (None, None)),
+]
+
+
+@pytest.mark.parametrize("text, expected", CASES)
+def test_parse_date_range(text, expected):
+    assert parse_date_range(text) == expected
+
+
+def test_yearless_dates_follow_reference_date():
+    # 10 月以降に 1〜3 月の日付が出てきたら翌年
+    assert parse_date_range("2/1～2/3", ref=date(2025, 11, 1)) == ("2026/02/01", "2026/02/03")
+    assert parse_date_range("6/1", ref=date(2025, 11, 1)) == ("2025/06/01", "2025/06/01")
+    assert parse_date_range("2/1", ref=date(2025, 9, 30)) == ("2025/02/01", "2025/02/01")
+    assert parse_date("12/20～1/10", ref=date(2024, 6, 1)) == "2024/12/20"
+
+
+def test_reference_date_override(monkeypatch):
+    monkeypatch.setenv("SCRAPER_REFERENCE_DATE", "2024-10-15")
+    set_reference_date(None)
+    assert reference_date() == date(2024, 10, 15)
+    assert year_epoch() == "2024-late"
+    assert parse_date_range("1/5") == ("2025/01/05", "2025/01/05")
+
+    set_reference_date(date(2025, 3, 1))
+    assert reference_date() == date(2025, 3, 1)
+    assert year_epoch() == "2025-early"
+    assert parse_date_range("1/5") == ("2025/01/05", "2025/01/05")
+
+
+# ── 以前の方式との比較 ──
+# 置き換え前の scrape_itakon / m_scrape_tainai の parse_date_range（デバッグ出力は除く）
+
+def old_itakon_parse(text):
+    match = re.findall(r"(\d{1,2})[\/月](\d{1,2})[（(]?[^\d)]*[）)]?", text)
+    if not match:
+        return None, None
+    today = datetime.now()
+    current_year = today.year
+
+    def infer_year(month):
+        if today.month >= 10 and month <= 3:
+            return current_year + 1
+        return current_year
+
+    start_month, start_day = map(int, match[0])
+    start = f"{infer_year(start_month)}/{start_month:02d}/{start_day:02d}"
+    if len(match) > 1:
+        end_month, end_day = map(int, match[1])
+        end = f"{infer_year(end_month)}/{end_month:02d}/{end_day:02d}"
+    else:
+        end = start
+    return start, end
+
+
+def old_tainai_parse(text):
+    text = re.sub(r"\([^\)]*\)", "", text).strip()
+    match = re.findall(r"(\d{1,2})月(\d{1,2})日\s*~\s*(\d{1,2})月(\d{1,2})日", text)
+    year = datetime.now().year
+    if match:
+        start_month, start_day = map(int, match[0][0:2])
+        end_month, end_day = map(int, match[0][2:4])
+        return f"{year}/{start_month:02d}/{start_day:02d}", f"{year}/{end_month:02d}/{end_day:02d}"
+    match_single = re.findall(r"(\d{1,2})月(\d{1,2})日", text)
+    if match_single:
+        start_month, start_day = map(int, match_single[0])
+        start = f"{year}/{start_month:02d}/{start_day:02d}"
+        return start, start
+    return None, None
+
+
+# 1 回の実行で読む量の日付文字列（すべて別の文字列）
+CORPUS = (
+    [f"{m}月{d}日(土)～{m}月{d + 2}日(月)" for m in range(1, 13) for d in range(1, 26)]
+    + [f"{m}/{d}（日）" for m in range(1, 13) for d in range(1, 26)]
+)
+# 同じページを何度も読み直す場合（reprocess が数週間分のスナップショットを読む等）
+REPEATED = CORPUS * 5
+
+
+def old_approach(texts):
+    # 館ごとのパーサーをそれぞれの表記に使っていた
+    return [old_tainai_parse(t) if "月" in t else old_itakon_parse(t) for t in texts]
+
+
+def new_approach(texts):
+    return [parse_date_range(t) for t in texts]
+
+
+def _fastest(name):
+    # bench.measure で記録した最短時間（他のテストや CI の揺れを受けにくい）
+    return min(r["min_ms"] for r in conftest._results if r["name"] == name)
+
+
+def test_date_parser_speed(bench):
+    """以前の方式と比べる。毎回別の文字列でも遅くならず、同じ文字列が繰り返されればキャッシュで速い
+
+    measure は各回の前に date_parser のキャッシュを空にする（1 回 = 1 実行）。
+    """
+    # 途中でマシンの速さが変わっても片方だけが得をしないよう、交互に何度か測る
+    for _ in range(3):
+        bench.measure("date_parser:old-regex", old_approach, CORPUS)
+        bench.measure("date_parser:uncached", new_approach, CORPUS)
+    bench.measure("date_parser:old-regex-repeated", old_approach, REPEATED)
+    bench.measure("date_parser:repeated", new_approach, REPEATED)
+
+    # 以前よりはるかに多くの表記を扱っても、キャッシュに当たらない実行で以前より遅くしない
+    assert _fastest("date_parser:uncached") <= _fastest("date_parser:old-regex")
+    assert _fastest("date_parser:repeated") < _fastest("date_parser:old-regex-repeated")
+    assert date_parser._parse.cache_info().maxsize >= len(CORPUS)
@@ -0,0 +1,302 @@
+# scripts/scrapers/benchmarks/test_event_sync.py
+#
+# event_sync の取り下げ（reconcile）を、メモリ上の偽の Supabase クライアントで確かめる
+#  - 消えた今後のイベントだけを 1 回の update で取り下げる
+#  - WITHDRAW_FREE_COUNT 件までは割合に関係なく取り下げ、それを超えて MAX_WITHDRAW_RATIO を超えたら見送る
+#  - engine のページ送りは item のないページまで取れたときだけ取り下げる
+#  - アーカイブの再生（replay）では取り下げも取り下げの解除もしない
+
+import contextlib
+import functools
+import io
+
+from src.lib import event_sync
+from src.lib.event_sync import EventSink, sync_events
+
+MUSEUM_ID = "museum-1"
+
+
+class FakeResult:
+    def __init__(self, data):
+        self.data = data
+
+
+class FakeQuery:
+    def __init__(self, client):
+        self.client = client
+        self.op = None
+        self.filters = {}
+        self.bounds = None
+        self.ordering = None
+
+    def select(self, columns):
+        self.op = ("select",)
+        return self
+
+    def eq(self, column, value):
+        self.filters[column] = value
+        return self
+
+    def in_(self, column, values):
+        self.filters[column] = set(values)
+        return self
+
+    def order(self, column):
+        self.ordering = column
+        return self
+
+    def range(self, start, end):
+        self.bounds = (start, end)
+        return self
+
+    def upsert(self, rows, on_conflict=""):
+        self.op = ("upsert", rows)
+        return self
+
+    def update(self, values):
+        self.op = ("update", values)
+        return self
+
+    def execute(self):
+        kind = self.op[0]
+        self.client.calls.append(kind)
+        rows = self.client.rows
+        if kind == "select":
+            found = [r for r in rows if all(r.get(k) == v for k, v in self.filters.items())]
+            if self.ordering:
+                found.sort(key=lambda r: r[self.ordering])
+            elif self.client.calls.count("select") % 2 == 0:
+                # 並び順を指定しない select は、呼ぶたびに並びが変わりうる（Postgres と同じ）
+                found.reverse()
+            return FakeResult(found[self.bounds[0]:self.bounds[1] + 1])
+        if kind == "upsert":
+            for new in self.op[1]:
+                key = event_sync.event_key(new)
+                for row in rows:
+                    if event_sync.event_key(row) == key:
+                        row.update(new)
+                        break
+                else:
+                    rows.append(dict(new, id=len(rows) + 1, withdrawn_at=new.get("withdrawn_at")))
+            return FakeResult(self.op[1])
+        ids = self.filters["id"]
+        for row in rows:
+            if row["id"] in ids:
+                row.update(self.op[1])
+        return FakeResult([])
+
+
+class FakeClient:
+    def __init__(self):
+        self.rows = []
+        self.calls = []
+
+    def table(self, name):
+        return FakeQuery(self)
+
+
+def event(title, day):
+    return {
+        "museum_id": MUSEUM_ID,
+        "title": title,
+        "start_date": day,
+        "end_date": day,
+        "event_description": "",
+        "event_url": "https://example.com/",
+    }
+
+
+# 今日より後の日付（取り下げの対象になる）
+UPCOMING = [event(f"展示{i}", f"2099/01/{i + 1:02d}") for i in range(10)]
+
+
+def sync(client, events, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return sync_events([dict(e) for e in events], client=client, **kwargs)
+
+
+def withdrawn(client):
+    return sorted(row["title"] for row in client.rows if row.get("withdrawn_at"))
+
+
+def seeded(events):
+    client = FakeClient()
+    sync(client, events, reconcile=True)
+    client.calls.clear()
+    return client
+
+
+def test_withdraws_missing_upcoming_in_one_update():
+    past = event("昔の展示", "2000/01/01")
+    client = seeded(UPCOMING + [past])
+
+    counts = sync(client, UPCOMING[:8], reconcile=True)
+
+    assert counts["withdrawn"] == 2
+    assert withdrawn(client) == ["展示8", "展示9"]
+    assert client.calls.count("update") == 1
+
+
+def test_index_pages_in_stable_order(monkeypatch):
+    monkeypatch.setattr(event_sync, "SELECT_PAGE_SIZE", 3)
+    client = seeded(UPCOMING[:7])
+
+    index = event_sync.load_event_index(MUSEUM_ID, client)
+
+    assert client.calls.count("select") == 3
+    assert sorted(entry["id"] for entry in index.values()) == list(range(1, 8))
+
+
+def test_free_count_ignores_ratio(monkeypatch):
+    monkeypatch.setattr(event_sync, "MAX_WITHDRAW_RATIO", 0.1)
+    client = seeded(UPCOMING[:3])
+
+    # 3 件中 2 件（67%）が消えても WITHDRAW_FREE_COUNT 以内なので取り下げる
+    counts = sync(client, UPCOMING[:1], reconcile=True)
+
+    assert event_sync.WITHDRAW_FREE_COUNT == 2
+    assert counts["withdrawn"] == 2
+
+
+def test_ratio_allows_up_to_limit(monkeypatch):
+    monkeypatch.setattr(event_sync, "MAX_WITHDRAW_RATIO", 0.5)
+    client = seeded(UPCOMING)
+
+    # 10 件中 5 件はちょうど上限なので取り下げる
+    counts = sync(client, UPCOMING[:5], reconcile=True)
+
+    assert counts["withdrawn"] == 5
+
+
+def test_refuses_mass_removal(monkeypatch):
+    monkeypatch.setattr(event_sync, "MAX_WITHDRAW_RATIO", 0.5)
+    client = seeded(UPCOMING)
+
+    counts = sync(client, UPCOMING[:4], reconcile=True)
+
+    assert counts["withdrawn"] == 0
+    assert withdrawn(client) == []
+    assert "update" not in client.calls
+
+
+def test_no_reconcile_after_crawl_error():
+    client = seeded(UPCOMING)
+
+    def crawl():
+        yield dict(UPCOMING[0])
+        raise RuntimeError("取得失敗")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        try:
+            sync_events(crawl(), client=client, reconcile=True)
+        except RuntimeError:
+            pass
+
+    assert withdrawn(client) == []
+
+
+def test_reprocess_sink_keeps_withdrawals():
+    client = seeded(UPCOMING[:3])
+    sync(client, UPCOMING[:2], reconcile=True)
+    assert withdrawn(client) == ["展示2"]
+
+    # 古いスナップショットの再処理（既定の EventSink）では取り下げを戻さず、行も送らない
+    client.calls.clear()
+    with contextlib.redirect_stdout(io.StringIO()):
+        with EventSink(client) as sink:
+            sink.extend([dict(e) for e in UPCOMING[:3]])
+    assert withdrawn(client) == ["展示2"]
+    assert "upsert" not in client.calls
+
+    # ライブの取得で再び掲載されたら戻す
+    sync(client, UPCOMING[:3], reconcile=True)
+    assert withdrawn(client) == []
+
+
+def paged_museum(monkeypatch, client, pages, max_pages=3):
+    from scripts.scrapers import engine
+
+    museum = engine.Museum({
+        "name": "paged",
+        "museum_id": MUSEUM_ID,
+        "url": "https://example.com/list/1",
+        "item": "div.item",
+        "title": "h3",
+        "date": "p",
+        "exclude": ["休館"],
+        "pages": {"url": "https://example.com/list/{page}", "start": 2, "max": max_pages},
+    })
+    html = {
+        f"https://example.com/list/{n}": "".join(
+            f'<div class="item"><h3>{title}</h3><p>{day}</p></div>' for title, day in items
+        )
+        for n, items in enumerate(pages, 1)
+    }
+    monkeypatch.setattr(museum, "_fetch", lambda url, conditional=False: html.get(url, "<div></div>"))
+    monkeypatch.setattr(engine, "EventSink", functools.partial(EventSink, client))
+    return museum
+
+
+def run_museum(museum):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return museum.save_to_supabase(museum.fetch_events())
+
+
+def test_engine_reconciles_complete_listing(monkeypatch):
+    client = seeded(UPCOMING[:4])
+    # 2 ページ目は除外キーワードだけでイベント 0 件になるが、item はあるので 3 ページ目まで進む
+    pages = [
+        [("展示0", "2099/01/01")],
+        [("休館のお知らせ", "2099/01/02")],
+        [("展示1", "2099/01/02"), ("展示2", "2099/01/03")],
+    ]
+    counts = run_museum(paged_museum(monkeypatch, client, pages, max_pages=5))
+
+    assert counts["received"] == 3
+    assert withdrawn(client) == ["展示3"]
+
+
+def test_engine_skips_reconcile_at_page_limit(monkeypatch):
+    client = seeded(UPCOMING[:4])
+    pages = [
+        [("展示0", "2099/01/01")],
+        [("展示1", "2099/01/02")],
+    ]
+    counts = run_museum(paged_museum(monkeypatch, client, pages, max_pages=1))
+
+    assert counts["received"] == 2
+    assert counts["withdrawn"] == 0
+    assert withdrawn(client) == []
+
+
+def test_replay_never_withdraws_or_restores(monkeypatch):
+    from src.lib import page_archive
+
+    client = seeded(UPCOMING[:3])
+    sync(client, UPCOMING[:2], reconcile=True)
+    assert withdrawn(client) == ["展示2"]
+
+    # 過去のスナップショットの再生: 今あるイベントが載っていなくても取り下げず、取り下げ済みも戻さない
+    monkeypatch.setattr(page_archive, "_mode", "replay")
+    client.calls.clear()
+    counts = sync(client, UPCOMING[:1] + UPCOMING[2:3], reconcile=True)
+
+    assert counts["withdrawn"] == 0
+    assert withdrawn(client) == ["展示2"]
+    assert "update" not in client.calls
+    assert "upsert" not in client.calls
+
+
+def test_run_all_replay_uses_replay_date(monkeypatch):
+    from src.lib import date_parser, page_archive
+    from scripts.scrapers import run_all
+
+    monkeypatch.setattr(page_archive, "_mode", page_archive.mode())
+    monkeypatch.setattr(page_archive, "_replay_date", None)
+    monkeypatch.setattr(page_archive, "_latest", None)
+    with contextlib.redirect_stdout(io.StringIO()):
+        run_all.main(["--fetch-mode", "replay", "--replay-date", "2024-11-20", "--only", "(none)", "--skip-museums"])
+
+    assert date_parser.reference_date().isoformat() == "2024-11-20"
+    # 2024 年 11 月の記録の「1/10」は 2025 年
+    assert date_parser.parse_date_range("1/10") == ("2025/01/10", "2025/01/10")
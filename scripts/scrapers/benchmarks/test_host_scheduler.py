@@ -0,0 +1,100 @@
+# scripts/scrapers/benchmarks/test_host_scheduler.py
+#
+# host_scheduler の順番待ちを、実時間を使わない時計で確かめる
+#  - トークンは rate 回/秒で burst 回分まで補充される
+#  - ホストごとの同時接続数は他のホストに影響しない
+#  - defer（Retry-After）はそのホストだけを止め、MAX_RETRY_AFTER 秒より長くは止めない
+
+import contextlib
+import io
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+from src.lib import host_scheduler
+from src.lib.host_scheduler import HostScheduler, retry_after_seconds
+
+URL = "https://example.com/events"
+OTHER_URL = "https://example.org/events"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+def scheduler(clock, **kwargs):
+    return HostScheduler(host_limits={}, clock=clock, sleep=clock.sleep, **kwargs)
+
+
+def fetch(sched, url):
+    with sched.slot(url):
+        pass
+
+
+def test_tokens_refill_at_rate_up_to_burst():
+    clock = FakeClock()
+    sched = scheduler(clock, rate=2.0, burst=2)
+
+    # burst 回までは待たずに取れ、3 回目は 1 トークン分（1 / rate 秒）待つ
+    fetch(sched, URL)
+    fetch(sched, URL)
+    assert clock.slept == []
+    fetch(sched, URL)
+    assert clock.slept == [0.5]
+
+    # 長く空いても burst 回分までしか貯まらない
+    clock.now += 60
+    clock.slept.clear()
+    for _ in range(3):
+        fetch(sched, URL)
+    assert clock.slept == [0.5]
+
+
+def test_host_concurrency_is_per_host():
+    clock = FakeClock()
+    sched = scheduler(clock, host_concurrency=1)
+
+    with sched.slot(URL):
+        # 同じホストの枠は埋まっているが、別のホストは取れる
+        assert not sched._host("example.com").slots.acquire(blocking=False)
+        fetch(sched, OTHER_URL)
+    assert sched._host("example.com").slots.acquire(blocking=False)
+
+
+def test_defer_pauses_only_that_host():
+    clock = FakeClock()
+    sched = scheduler(clock)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        sched.defer(URL, 30)
+    fetch(sched, OTHER_URL)
+    assert clock.slept == []
+    fetch(sched, URL)
+    assert clock.slept == [30.0]
+
+    # 極端に長い Retry-After は MAX_RETRY_AFTER 秒で打ち切る
+    clock.slept.clear()
+    with contextlib.redirect_stdout(io.StringIO()):
+        sched.defer(URL, 86400)
+    fetch(sched, URL)
+    assert clock.slept == [host_scheduler.MAX_RETRY_AFTER]
+
+
+def test_retry_after_seconds():
+    assert retry_after_seconds("120") == 120.0
+    assert retry_after_seconds(" 5 ") == 5.0
+    assert retry_after_seconds("") is None
+    assert retry_after_seconds("soon") is None
+    # HTTP 日付は今からの秒数（過ぎていれば 0）
+    past = format_datetime(datetime.now(timezone.utc) - timedelta(minutes=5), usegmt=True)
+    assert retry_after_seconds(past) == 0.0
+    future = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=60), usegmt=True)
+    assert 55 <= retry_after_seconds(future) <= 60
@@ -0,0 +1,58 @@
+# scripts/scrapers/benchmarks/test_imports.py
+#
+# 各スクレイパー（と museums.json の館を動かす engine.py）を新しいプロセスで import し、
+# import 時間と副作用を確認する
+#  - import だけで Supabase・Playwright・httpx・dotenv を読み込まないこと
+#  - import だけで何も出力しないこと（認証情報の表示や接続は同期時まで行わない）
+#  - import 時間が budgets.json の import 予算以内であること
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import BASE_DIR
+from scripts.scrapers.run_all import SCRAPER_DIR
+from test_parse import CASES
+
+IMPORT_ROUNDS = 3
+# museums.json の館はスクリプトを持たないので、代わりに engine.py を確かめる
+SCRIPTS = sorted(n for n in CASES if os.path.exists(os.path.join(SCRAPER_DIR, n + ".py"))) + ["engine"]
+PROBE = """
+import contextlib, importlib.util, io, json, sys, time
+sys.path.append({base!r})
+out = io.StringIO()
+started = time.perf_counter()
+with contextlib.redirect_stdout(out):
+    spec = importlib.util.spec_from_file_location("probe", {path!r})
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+elapsed = (time.perf_counter() - started) * 1000
+print(json.dumps({{"ms": elapsed, "stdout": out.getvalue(), "modules": sorted({{m.split(".")[0] for m in sys.modules}})}}))
+"""
+
+
+def probe(path):
+    # 認証情報がなくても import できることを確かめるため、Supabase の環境変数は渡さない
+    env = {k: v for k, v in os.environ.items() if not k.startswith("SUPABASE_")}
+    res = subprocess.run(
+        [sys.executable, "-c", PROBE.format(base=BASE_DIR, path=path)],
+        capture_output=True, text=True, env=env, cwd=BASE_DIR, timeout=60,
+    )
+    assert res.returncode == 0, res.stderr
+    return json.loads(res.stdout.strip().splitlines()[-1])
+
+
+@pytest.mark.parametrize("name", SCRIPTS)
+def test_import_budget(bench, name):
+    path = os.path.join(SCRAPER_DIR, name + ".py")
+    runs = [probe(path) for _ in range(min(bench.rounds, IMPORT_ROUNDS))]
+
+    forbidden = set(bench.budgets.get("import", {}).get("forbidden_modules", []))
+    loaded = forbidden.intersection(runs[0]["modules"])
+    assert not loaded, f"import 時に読み込まれた依存: {sorted(loaded)}"
+    assert runs[0]["stdout"] == "", f"import 時の出力: {runs[0]['stdout']!r}"
+
+    bench.report(f"import:{name}", [r["ms"] for r in runs], budget=bench.budget(name, "import"))
@@ -0,0 +1,50 @@
+# scripts/scrapers/benchmarks/test_keyword_filter.py
+#
+# keyword_filter の Aho-Corasick オートマトンを、素直な部分文字列の判定と突き合わせる
+#  - 一致するかどうかは any(k in title ...) と同じ
+#  - 返すキーワードは、最も手前で一致が終わるもの（同じ位置なら長い方）
+
+import random
+import unicodedata
+
+from src.lib.keyword_filter import EventFilter, KeywordMatcher
+
+# 互いに接頭辞・接尾辞を共有して失敗リンクをたどる場面が多いキーワード
+KEYWORDS = ["ab", "bab", "abc", "c", "bca", "aaab", "休館", "休館日", "館日", "臨時休館"]
+ALPHABET = "abc休館日臨時 "
+
+
+def naive_search(keywords, text):
+    text = unicodedata.normalize("NFKC", text)
+    found = [(text.find(k) + len(k), -len(k), k) for k in keywords if k in text]
+    return min(found)[2] if found else None
+
+
+def test_matches_naive_search():
+    rng = random.Random(20250601)
+    for size in range(1, len(KEYWORDS) + 1):
+        keywords = rng.sample(KEYWORDS, size)
+        matcher = KeywordMatcher(keywords)
+        for _ in range(200):
+            text = "".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 12)))
+            assert (matcher.search(text) is not None) == any(k in text for k in keywords), (keywords, text)
+            assert matcher.search(text) == naive_search(keywords, text), (keywords, text)
+
+
+def test_normalizes_keywords_and_titles():
+    matcher = KeywordMatcher(["ＮＰＯ", "１２月"])
+    assert matcher.search("npo") is None
+    assert matcher.search("NPO法人のお知らせ") == "NPO"
+    assert matcher.search("１２月の観察会") == "12月"
+    assert matcher.search("12月の観察会") == "12月"
+    # 空のキーワードはどのタイトルにも一致させない
+    assert KeywordMatcher(["", None]).search("企画展") is None
+
+
+def test_event_filter():
+    event_filter = EventFilter(exclude=["休館"], include=["企画展", "観察会"])
+    assert event_filter.excluded_by("臨時休館のお知らせ") == "休館"
+    assert event_filter.excluded_by("企画展「昆虫」") is None
+    assert event_filter.included("自然観察会")
+    assert not event_filter.included("講演会")
+    assert EventFilter().included("講演会")
@@ -0,0 +1,166 @@
+# scripts/scrapers/benchmarks/test_parse.py
+#
+# 各館のスクレイパー（スクリプトと museums.json の館）の parse_events() を合成 HTML（conftest.py 参照）で計測する
+#   python -m pytest scripts/scrapers/benchmarks -q
+#   python -m pytest scripts/scrapers/benchmarks -q --bench-scale 3   # 遅い CI 向けに予算を緩める
+
+import contextlib
+import io
+import json
+import os
+import re
+
+import pytest
+from bs4 import NavigableString
+
+from conftest import read_fixture
+from scripts.scrapers.engine import load_museums
+from scripts.scrapers.run_all import SCRAPER_DIR, load_scraper
+
+# スクリプト名または館名: (parse_events に渡す URL, 合成フィクスチャから取れるはずのイベント数)
+CASES = {
+    "scrape_itakon": ("https://www.itakon.com/news/events", 36),
+    "scrape_ryuyo": ("https://ryu-yo.jp/event/", 40),
+    "kamei": ("https://kameimuseum.or.jp/schedule/", 32),
+    "m_scrape_tainai": ("https://www.city.tainai.niigata.jp/kurashi/kyoiku/bunka-sports/insect/kyousitsu/kyousitsu.html", 40),
+    "saitama-sizen": ("https://shizen.spec.ed.jp/イベント", 36),
+    "scrape_ibaraki-sizen": ("https://www.nat.museum.ibk.ed.jp/eventpage/daily.html", 35),
+    "scrape_ht-shizenkan": ("https://www.ht-shizenkan.com/s/event/", 40),
+    "m_scrape_otawara-kansatukan": ("https://kansatukan.jp/event.html", 30),
+    "m_scrape_adachi-seibutuen": ("https://www.seibutuen.jp/event/OEandSE/1.html", 1),
+}
+
+
+def load(name):
+    museums = load_museums()
+    if name in museums:
+        return museums[name]
+    try:
+        return load_scraper(os.path.join(SCRAPER_DIR, name + ".py"))
+    except Exception as e:
+        pytest.skip(f"{name} を読み込めない: {e}")
+
+
+@pytest.mark.parametrize("name", sorted(CASES))
+def test_parse_events(bench, name):
+    url, expected = CASES[name]
+    module = load(name)
+    html = read_fixture(name)
+
+    events = bench.measure(name, module.parse_events, html, url)
+
+    assert len(events) == expected
+    for event in events:
+        assert event["title"]
+        assert event["start_date"]
+        assert event["museum_id"] == module.MUSEUM_ID
+
+
+# section_cache を使うスクレイパー（見出しブロックごとに結果を使い回す）
+SECTION_CACHED = ["m_scrape_otawara-kansatukan", "m_scrape_tainai", "scrape_ht-shizenkan"]
+
+
+@pytest.mark.parametrize("name", SECTION_CACHED)
+def test_parse_events_section_cache(bench, name):
+    from src.lib.section_cache import SectionCache
+
+    url, expected = CASES[name]
+    module = load(name)
+    html = read_fixture(name)
+    # 1 回目で全ブロックを覚えさせ、2 回目以降（前回と同じページ）を測る
+    first = SectionCache(name, module.SECTION_VERSION)
+    with contextlib.redirect_stdout(io.StringIO()):
+        uncached = module.parse_events(html, url, first)
+
+    def parse_warm():
+        return module.parse_events(html, url, SectionCache(name, module.SECTION_VERSION, first.entries))
+
+    events = bench.measure(f"{name}:section-cache", parse_warm)
+
+    assert len(events) == expected
+    assert events == uncached
+
+
+# 見出しタグ（SECTION_CACHED の各スクレイパーが parse_sections に渡すもの）
+SECTION_TAGS = {"m_scrape_otawara-kansatukan": "h2", "m_scrape_tainai": "h3", "scrape_ht-shizenkan": "h4"}
+
+
+def _edit_block(soup, heading, edit):
+    from src.lib.section_cache import section_elements
+
+    for node in list(section_elements(heading)):
+        if isinstance(node, NavigableString):
+            node.replace_with(edit(str(node)))
+
+
+@pytest.mark.parametrize("name", SECTION_CACHED)
+def test_section_cache_matches_cold_parse(name):
+    """1 ブロックだけ変えたページで、キャッシュありの結果がパースし直した結果と同じになる"""
+    from src.lib.html_parser import parse_html
+    from src.lib.section_cache import SectionCache, section_siblings
+
+    url, _ = CASES[name]
+    module = load(name)
+    soup = parse_html(read_fixture(name))
+    first, second = soup.find_all(SECTION_TAGS[name])[:2]
+    # 1 つ目のブロックを見出しだけにし、ブロックの外を読むパーサーが次のブロックの日付を拾う状態にする
+    for sib in section_siblings(first):
+        sib.extract()
+    before = str(soup)
+    # 2 つ目のブロックの日付だけを変える
+    _edit_block(soup, second, lambda text: re.sub(r"(\d+)日", lambda m: f"{int(m.group(1)) % 27 + 1}日", text))
+    after = str(soup)
+
+    cache = SectionCache(name, module.SECTION_VERSION)
+    with contextlib.redirect_stdout(io.StringIO()):
+        module.parse_events(before, url, cache)
+        warm = module.parse_events(after, url, SectionCache(name, module.SECTION_VERSION, cache.entries))
+        cold = module.parse_events(after, url)
+
+    assert warm == cold
+
+
+def test_section_block_with_wrapped_headings():
+    """見出しが自分の div に包まれていても、ブロックは文書順で次の同じ見出しの手前まで"""
+    from src.lib.html_parser import parse_html
+    from src.lib.section_cache import section_find, section_hash, section_siblings
+
+    def page(first_day, second_day):
+        return parse_html(
+            f'<div class="ttl"><h4>観察会</h4></div><p>2025年5月{first_day}日</p><p>説明</p>'
+            f'<div class="ttl"><h4>企画展</h4></div><p>2025年6月{second_day}日</p>'
+        )
+
+    first, second = page(3, 7).find_all("h4")
+    assert section_find(first, string=re.compile(r"\d{4}年")) == "2025年5月3日"
+    assert section_find(second, string=re.compile(r"\d{4}年")) == "2025年6月7日"
+    assert [sib.get_text() for sib in section_siblings(first)] == ["2025年5月3日", "説明"]
+    # 次のブロックが変わっても前のブロックのハッシュは変わらず、自分のブロックが変われば変わる
+    assert section_hash(page(3, 8).find("h4")) == section_hash(first)
+    assert section_hash(page(4, 7).find("h4")) != section_hash(first)
+
+
+def test_invalid_museum_spec_is_skipped(tmp_path):
+    """museums.json の 1 館の不備で全体を止めず、その館だけを error にする"""
+    from scripts.scrapers import run_all
+
+    good = {"name": "good", "museum_id": "museum-1", "url": "https://example.com/",
+            "item": "div.item", "title": "h3", "date": "p"}
+    path = tmp_path / "museums.json"
+    path.write_text(json.dumps({"museums": [
+        {"name": "no-date", "museum_id": "museum-2", "url": "https://example.com/", "item": "li", "title": "h3"},
+        good,
+        dict(good, name="twin"),
+        dict(good, name="twin", museum_id="museum-3"),
+    ]}), encoding="utf-8")
+
+    with pytest.raises(ValueError):
+        load_museums(path)
+
+    invalid = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        museums = load_museums(path, invalid=invalid)
+        results = run_all.run_all([], museums={}, invalid=invalid)
+    assert list(museums) == ["good"]
+    assert sorted(invalid) == ["no-date", "twin"]
+    assert results == {"no-date": ("error", 0, 0.0), "twin": ("error", 0, 0.0)}
@@ -0,0 +1,90 @@
+# scripts/scrapers/benchmarks/test_recrawl_schedule.py
+#
+# recrawl_schedule の取得間隔を、日付を固定した履歴で確かめる
+#  - 変化の頻度から間隔を決め、季節の変わり目は毎日取得する
+#  - 既知のイベントの開始 LEAD_DAYS 日前には取得が回ってくる
+#  - NotModified（digest=None）は前回の digest を引き継ぎ、変化として数えない
+
+from datetime import date, timedelta
+
+import pytest
+
+from src.lib import recrawl_schedule
+from src.lib.recrawl_schedule import MAX_INTERVAL_DAYS, interval_days, load_history, record
+
+# どの季節の変わり目にも入らない日
+DAY = date(2025, 6, 10)
+
+
+def history(changes, runs=8, every=4, upcoming=()):
+    """DAY までの every 日おきの runs 回の記録。最後の changes 回だけ内容が変わった"""
+    first = DAY - timedelta(days=every * (runs - 1))
+    return {
+        "name": "test",
+        "runs": [
+            {"date": (first + timedelta(days=every * i)).isoformat(), "digest": str(i), "changed": i >= runs - changes}
+            for i in range(runs)
+        ],
+        "upcoming": list(upcoming),
+    }
+
+
+@pytest.fixture
+def recrawl_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(recrawl_schedule, "RECRAWL_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_interval_follows_change_rate():
+    # 記録が少ないうちは毎日
+    assert interval_days(history(0, runs=recrawl_schedule.MIN_OBSERVATIONS - 1), DAY) == 1
+    # 28 日間変化なし → 上限、2 回 → 28 // 2 // 2 = 7、4 回 → 3
+    assert interval_days(history(0), DAY) == MAX_INTERVAL_DAYS
+    assert interval_days(history(2), DAY) == min(MAX_INTERVAL_DAYS, 7)
+    assert interval_days(history(4), DAY) == 3
+
+
+def test_season_window_is_daily():
+    quiet = history(0)
+    for month, day in recrawl_schedule.SEASON_STARTS:
+        start = date(2025, month, day)
+        assert interval_days(quiet, start) == 1
+        assert interval_days(quiet, start + timedelta(days=recrawl_schedule.SEASON_WINDOW_DAYS - 1)) == 1
+    # 7/1 からの窓を過ぎれば変化の頻度どおり
+    assert interval_days(quiet, date(2025, 7, 1) + timedelta(days=recrawl_schedule.SEASON_WINDOW_DAYS)) == MAX_INTERVAL_DAYS
+
+
+def test_upcoming_event_clamps_to_lead_days():
+    lead = recrawl_schedule.LEAD_DAYS
+    # 開始 5 日前なら、LEAD_DAYS 日前（2 日後）に取得する
+    soon = (DAY + timedelta(days=lead + 2)).isoformat()
+    assert interval_days(history(0, upcoming=[soon]), DAY) == 2
+    # すでに LEAD_DAYS 日以内なら毎日、過去の開始日は見ない
+    near = (DAY + timedelta(days=1)).isoformat()
+    assert interval_days(history(0, upcoming=[near]), DAY) == 1
+    past = (DAY - timedelta(days=1)).isoformat()
+    assert interval_days(history(0, upcoming=[past]), DAY) == MAX_INTERVAL_DAYS
+
+
+def test_record_not_modified_reuses_digest(recrawl_dir):
+    record("m", "a", day=DAY)
+    next_day, interval = record("m", None, day=DAY + timedelta(days=1))
+    runs = load_history("m")["runs"]
+    assert runs[-1] == {"date": "2025-06-11", "digest": "a", "changed": False}
+    assert next_day == (DAY + timedelta(days=1 + interval)).isoformat()
+
+    record("m", "b", day=DAY + timedelta(days=2))
+    assert load_history("m")["runs"][-1]["changed"] is True
+
+    # 同じ日の 2 回目は 1 回目を置き換える
+    record("m", "c", day=DAY + timedelta(days=2))
+    runs = load_history("m")["runs"]
+    assert [run["digest"] for run in runs] == ["a", "a", "c"]
+    assert runs[-1]["changed"] is True
+
+
+def test_record_without_previous_digest_is_not_a_change(recrawl_dir):
+    # 初回が NotModified（digest が分からない）なら、次の内容は変化として数えない
+    record("m", None, day=DAY)
+    record("m", "a", day=DAY + timedelta(days=1))
+    assert [run["changed"] for run in load_history("m")["runs"]] == [False, False]
@@ -0,0 +1,228 @@
+# scripts/scrapers/engine.py
+#
+# 定義ファイル（museums.json）だけで館を追加できる汎用スクレイパー
+# 一覧ページの作りが単純な館は、スクリプトを書かずに URL・セレクタ・取得方法・キーワードを定義に書く
+# run_all がスクリプトのスクレイパーと同じ扱いで並列実行する（HTTP・ブラウザ・同期は全館で共有）
+#   python -m scripts.scrapers.run_all --only kamei saitama-sizen
+#
+# 定義の項目（* は必須）:
+#   name*          館の名前（run_all の --only・計測の scraper ラベルに使う）
+#   museum_id*     Supabase の museums.id
+#   url*           イベント一覧の URL
+#   item*          1 イベント分の要素の CSS セレクタ
+#   title* / date* / description   item の中の CSS セレクタ（description は省略可）
+#   fetch          http（条件付き GET、既定）/ tiered（HTTP で足りなければブラウザ）/ browser
+#   pages          2 ページ目以降 {"url": "...{page}...", "start": 2, "max": 10}
+#                  item が 1 件もないページで打ち切る
+#                  （そこまで取れたときだけ一覧の全件とみなし、ページから消えたイベントを取り下げる。
+#                   max ページに達したときは取り下げない）
+#   strainer       パースする要素を絞る {"name": "div", "class": "list_wrap"}
+#   date_pattern   date のテキストから日付部分だけを取り出す正規表現
+#   require        {"selector": ..., "contains": ...} その要素がある item は contains を含むものだけ対象にする
+#   exclude / include     館ごとの除外・対象キーワード（共通の除外キーワードに足す）
+#   dedupe_description    説明文の重複した文を除く
+
+import json
+import os
+import re
+import sys
+
+SCRAPER_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE_DIR = os.path.abspath(os.path.join(SCRAPER_DIR, "..", ".."))
+sys.path.append(BASE_DIR)
+
+from src.lib import metrics
+from src.lib.browser_pool import get_browser_pool
+from src.lib.date_parser import parse_date_range
+from src.lib.event_sync import EventSink
+from src.lib.html_parser import parse_html, strainer
+from src.lib.http_cache import commit, conditional_get
+from src.lib.http_client import fetch_text
+from src.lib.keyword_filter import load_event_filter
+from src.lib.text_utils import clean_text, remove_duplicate_sentences
+from src.lib.tiered_fetch import fetch_html
+
+MUSEUMS_PATH = os.path.join(SCRAPER_DIR, "museums.json")
+FETCH_MODES = ("http", "tiered", "browser")
+REQUIRED_KEYS = ("name", "museum_id", "url", "item", "title", "date")
+
+
+class Museum:
+    """museums.json の 1 館分。スクリプトのスクレイパーと同じ関数（parse_events など）を持つ"""
+
+    def __init__(self, spec):
+        missing = [k for k in REQUIRED_KEYS if not spec.get(k)]
+        if missing:
+            raise ValueError(f"museums.json の {spec.get('name', '?')} に {', '.join(missing)} がありません")
+        fetch = spec.get("fetch", "http")
+        if fetch not in FETCH_MODES:
+            raise ValueError(f"{spec['name']}: fetch は {', '.join(FETCH_MODES)} のいずれか: {fetch}")
+
+        self.name = spec["name"]
+        self.spec = spec
+        self.fetch = fetch
+        self.pages = spec.get("pages")
+        # 直近の fetch_events が一覧の全ページを取り終えたか（save_to_supabase が取り下げの判断に使う）
+        self._complete = False
+        self.MUSEUM_ID = spec["museum_id"]
+        self.EVENT_URL = spec["url"]
+        # reprocess がアーカイブの記録をこの館に割り当てるときに使う
+        self.PAGE_URL_PATTERN = None
+        if self.pages:
+            page_url = re.escape(self.pages["url"]).replace(re.escape("{page}"), r"\d+")
+            self.PAGE_URL_PATTERN = re.compile(f"{re.escape(self.EVENT_URL)}|{page_url}")
+
+        only = spec.get("strainer")
+        self.only = strainer(only.get("name"), class_=only.get("class")) if only else None
+        self.date_pattern = re.compile(spec["date_pattern"]) if spec.get("date_pattern") else None
+        self.require = spec.get("require")
+        self.event_filter = load_event_filter(
+            tuple(spec.get("exclude", ())),
+            tuple(spec["include"]) if spec.get("include") else None,
+        )
+
+    def _text(self, item, field):
+        selector = self.spec.get(field)
+        el = item.select_one(selector) if selector else None
+        return clean_text(el.get_text() if el else "")
+
+    def _required(self, item):
+        if not self.require:
+            return True
+        el = item.select_one(self.require["selector"])
+        return el is None or self.require["contains"] in el.get_text()
+
+    def parse_events(self, html, url=None):
+        return self._parse_page(html, url)[1]
+
+    def _parse_page(self, html, url=None):
+        """(item の数, イベントのリスト) を返す"""
+        url = url or self.EVENT_URL
+        soup = parse_html(html, only=self.only)
+        items = soup.select(self.spec["item"])
+        if not items:
+            print(f"📭 [{self.name}] イベントが見つかりませんでした: {url}")
+            return 0, []
+
+        events = []
+        for item in items:
+            if not self._required(item):
+                continue
+            title = self._text(item, "title")
+            if not title or not self.event_filter.included(title):
+                continue
+            excluded = self.event_filter.excluded_by(title)
+            if excluded:
+                print(f"⚠️ 除外ワード検出（{excluded}）→ スキップ: {title}")
+                continue
+
+            date_text = self._text(item, "date")
+            if self.date_pattern:
+                m = self.date_pattern.search(date_text)
+                date_text = m.group(0) if m else ""
+            start_date, end_date = parse_date_range(date_text)
+            if not start_date:
+                metrics.inc("events_skipped", reason="date")
+                continue
+
+            description = self._text(item, "description")
+            if self.spec.get("dedupe_description"):
+                description = remove_duplicate_sentences(description)
+            events.append({
+                "title": title,
+                "museum_id": self.MUSEUM_ID,
+                "start_date": start_date,
+                "end_date": end_date,
+                "event_description": description,
+                "event_url": url,
+            })
+        return len(items), events
+
+    def _fetch(self, url, conditional=False):
+        if self.fetch == "tiered":
+            return fetch_html(url, self.spec["item"], owner=self.MUSEUM_ID)
+        if self.fetch == "browser":
+            return get_browser_pool().fetch_html(url, wait_for=self.spec["item"], owner=self.MUSEUM_ID)
+        # 1 ページだけの館は変更がなければ NotModified で同期ごと省略する
+        return conditional_get(url).text if conditional else fetch_text(url)
+
+    def _more_pages(self, first):
+        yield from first
+        start = self.pages.get("start", 2)
+        for page in range(start, start + self.pages.get("max", 10)):
+            url = self.pages["url"].format(page=page)
+            found, events = self._parse_page(self._fetch(url), url)
+            # 除外や日付なしで 0 件になったページでは止めず、item のないページまで進む
+            if not found:
+                self._complete = True
+                return
+            yield from events
+        print(f"⚠️ [{self.name}] {self.pages.get('max', 10)} ページで打ち切り（消えたイベントの取り下げはしない）")
+
+    def fetch_events(self):
+        self._complete = False
+        first = self.parse_events(self._fetch(self.EVENT_URL, conditional=not self.pages), self.EVENT_URL)
+        if not self.pages:
+            self._complete = True
+            return first
+        # 2 ページ目以降は取得しながら同期側へ流す
+        return self._more_pages(first)
+
+    def save_to_supabase(self, events):
+        # ライブの取得なので、再び掲載されたイベントの取り下げは戻す
+        with EventSink(restore_withdrawn=True) as sink:
+            sink.extend(events)
+            # 一覧の全ページを取り終えたときだけ、ページから消えたイベントを取り下げる（途中の例外では行わない）
+            sink.reconcile = self._complete
+        counts = sink.counts
+        # 同期に成功したときだけ検証子を保存し、次回は変更がなければ丸ごとスキップする
+        if not counts["errors"]:
+            commit(self.EVENT_URL)
+        return counts
+
+
+def load_museums(path=MUSEUMS_PATH, only=None, invalid=None):
+    """{name: Museum} を定義ファイルの順に返す。only を指定するとその名前だけ
+
+    定義に不備があると ValueError。invalid（dict）を渡すと、不備のある館は
+    {名前: 理由} に入れてログに出し、残りの館だけを返す（1 館の不備で全体を止めない）。
+    名前が重複した館は、どちらも不備として扱う。
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        specs = json.load(f)["museums"]
+    museums = {}
+    seen = set()
+    for index, spec in enumerate(specs):
+        name = spec.get("name") if isinstance(spec, dict) else None
+        name = name or f"museums[{index}]"
+        if only and name not in only:
+            seen.add(name)
+            continue
+        try:
+            if name in seen:
+                raise ValueError(f"museums.json で {name} が重複しています")
+            seen.add(name)
+            if not isinstance(spec, dict):
+                raise ValueError(f"museums.json の {name} がオブジェクトではありません")
+            museum = Museum(spec)
+        except ValueError as e:
+            if invalid is None:
+                raise
+            print(f"❌ [{name}] 定義の不備のため実行しない: {e}")
+            invalid[name] = str(e)
+            # 重複したときはどちらの定義が正しいか分からないので、先に読んだ方も実行しない
+            museums.pop(name, None)
+            continue
+        museums[museum.name] = museum
+    return museums
+
+
+_museums = None
+
+
+def get_museum(name):
+    """reprocess のワーカーから使う（定義ファイルはプロセスごとに 1 回だけ読む）"""
+    global _museums
+    if _museums is None:
+        _museums = load_museums()
+    return _museums[name]
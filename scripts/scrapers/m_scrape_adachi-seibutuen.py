@@ -1,110 +1,136 @@
 import os
+import sys
 import re
-import unicodedata
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urljoin
 
-import requests
-from dotenv import load_dotenv
-from supabase import create_client
-from playwright.sync_api import sync_playwright
-
 # ─── Env & Supabase ──────────────────────────────────────
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
-load_dotenv(os.path.join(BASE_DIR, ".env.test"), override=True)
-print("DEBUG SUPABASE_URL:", os.getenv("SUPABASE_URL"))
-print("DEBUG SUPABASE_KEY:", "[OK]" if os.getenv("SUPABASE_KEY") else "[MISSING]")
-supabase = create_client(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY"))
+sys.path.append(BASE_DIR)
+from src.lib import metrics
+from src.lib.browser_pool import ResourcePolicy
+from src.lib.date_parser import parse_date_range
+from src.lib.event_sync import sync_events
+from src.lib.html_parser import parse_html, strainer
+from src.lib.http_client import fetch_text
+from src.lib.supabase_client import get_supabase
+from src.lib.text_utils import clean_text
+from src.lib.tiered_fetch import fetch_html
+# .env.test の値を環境変数より優先する（クライアントは同期時に作る）
+ENV_FILE = os.path.join(BASE_DIR, ".env.test")
+# ENV_FILE の値を優先するか（reprocess もこの 2 つで同期先を選ぶ）
+ENV_OVERRIDE = True
 
 MUSEUM_ID = "e807944e-2b98-4809-a3fb-682a97a859af"
 CATEGORIES = [
     "OEandSE",
     "periodic_event",
 ]
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+    "AppleWebKit/537.36 (KHTML, like Gecko) "
+    "Chrome/114.0.0.0 Safari/537.36"
+)
+# 詳細ページの同時取得数（実際の同時ページ数は host_scheduler の上限も受ける）
+DETAIL_CONCURRENCY = int(os.getenv("ADACHI_DETAIL_CONCURRENCY", "4"))
+DETAIL_SELECTOR = "ul.c-list li p"
+# 日付は自サイトの JS が描画するので、外部ドメインへのリクエスト（CDN 以外）はすべて止める
+RESOURCE_POLICY = ResourcePolicy(first_party_only=True)
+# アーカイブからの再処理で parse_events に渡すページ（詳細ページのみ。index.html は対象外）
+PAGE_URL_PATTERN = re.compile(r"https://www\.seibutuen\.jp/event/[^/]+/(?!index\.html)[^/]+\.html")
+DETAIL_STRAINER = strainer(["h2", "h4", "ul"])
 
-def clean_text(s: str) -> str:
-    return re.sub(r"\s+", " ", unicodedata.normalize("NFKC", s or "")).strip()
+def parse_sids(text):
+    blob = re.search(r'(\{"articleType"[\s\S]*?\]\})', text)
+    if not blob:
+        return []
+    data = blob.group(1)
+    json_obj =   __import__('json').loads(data)
+    # collect all sids
+    return [b["sid"] for b in json_obj["blogs"]]
 
-def parse_date(raw: str):
-    m = re.search(r"(?:(\d{4})年)?(\d{1,2})月(\d{1,2})日[～〜\-](\d{1,2})月(\d{1,2})日", raw)
-    if not m:
-        return None, None
-    y, sm, sd, em, ed = m.groups()
-    year = int(y) if y else datetime.now().year
-    return f"{year}/{int(sm):02d}/{int(sd):02d}", f"{year}/{int(em):02d}/{int(ed):02d}"
+def fetch_sids(cat):
+    idx_url = f"https://www.seibutuen.jp/event/{cat}/index.html"
+    print("📥 Fetching index JSON:", idx_url)
+    sids = parse_sids(fetch_text(idx_url))
+    if not sids:
+        print("⚠️ JSON blob not found for", cat)
+    return sids
 
-def fetch_events():
-    events = []
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        ctx = browser.new_context(user_agent=(
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
-            "AppleWebKit/537.36 (KHTML, like Gecko) "
-            "Chrome/114.0.0.0 Safari/537.36"
-        ))
-        page = ctx.new_page()
+def has_date(date_el):
+    # 日付のリストは JS で埋まるので、HTTP の HTML に空の枠しかなければブラウザで取得させる
+    return parse_date_range(date_el.get_text())[0] is not None
+
+def fetch_detail(cat, sid):
+    detail_url = f"https://www.seibutuen.jp/event/{cat}/{sid}.html"
+    print("▶ Loading detail page:", detail_url)
+    # HTTP の HTML に日付があればそれを使い、なければブラウザで日付が描画された時点で取得する
+    # （networkidle は解析タグ等の通信まで待ってしまうので使わない）
+    try:
+        html = fetch_html(
+            detail_url,
+            DETAIL_SELECTOR,
+            wait_until="domcontentloaded",
+            timeout=10000,
+            user_agent=USER_AGENT,
+            owner=MUSEUM_ID,
+            check=has_date,
+            policy=RESOURCE_POLICY,
+        )
+    except Exception as e:
+        print("⚠️ detail load failed:", detail_url, e)
+        return None
+    return parse_detail(html, detail_url)
 
-        for cat in CATEGORIES:
-            idx_url = f"https://www.seibutuen.jp/event/{cat}/index.html"
-            print("📥 Fetching index JSON:", idx_url)
-            r = requests.get(idx_url)
-            r.encoding = r.apparent_encoding
-            blob = re.search(r'(\{"articleType"[\s\S]*?\]\})', r.text)
-            if not blob:
-                print("⚠️ JSON blob not found for", cat)
-                continue
-            data = blob.group(1)
-            json_obj =   __import__('json').loads(data)
-            # collect all sids
-            sids = [b["sid"] for b in json_obj["blogs"]]
+def parse_detail(html, detail_url):
+    soup = parse_html(html, only=DETAIL_STRAINER)
+    # タイトル
+    title_el = soup.select_one("h2")
+    title = clean_text(title_el.get_text() if title_el else "")
+    # 日付（JS後に .c-list 直下 or 独自クラスに入るはず）
+    # まずリスト内の <p>（最初の）を取得
+    date_el = soup.select_one(DETAIL_SELECTOR)
+    date_text = date_el.get_text() if date_el else ""
+    start, end = parse_date_range(date_text)
+    if not start:
+        print("⚠️ date parse failed:", date_text)
+        metrics.inc("events_skipped", reason="date")
+        return None
+    # リード文
+    lead_el = soup.select_one("h4.lead")
+    lead = clean_text(lead_el.get_text()) if lead_el else ""
 
-            for sid in sids:
-                detail_url = f"https://www.seibutuen.jp/event/{cat}/{sid}.html"
-                print("▶ Loading detail page:", detail_url)
-                page.goto(detail_url)
-                page.wait_for_load_state("networkidle")
-                # タイトル
-                title = clean_text(page.locator("h2").inner_text())
-                # 日付（JS後に .c-list 直下 or 独自クラスに入るはず）
-                # まずリスト内の <p>（最初の）を取得
-                date_text = page.locator("ul.c-list li p").first.inner_text()
-                start, end = parse_date(date_text)
-                if not start:
-                    print("⚠️ date parse failed:", date_text)
-                    continue
-                # リード文
-                lead = ""
-                if page.locator("h4.lead").count():
-                    lead = clean_text(page.locator("h4.lead").inner_text())
+    return {
+        "title":             title,
+        "museum_id":         MUSEUM_ID,
+        "start_date":        start,
+        "end_date":          end or start,
+        "event_description": lead,
+        "event_url":         detail_url,
+    }
+
+def parse_events(html, url):
+    # 詳細ページ 1 枚につきイベント 1 件
+    event = parse_detail(html, url)
+    return [event] if event else []
+
+def fetch_events():
+    """イベントを 1 件ずつ返すジェネレーター"""
+    targets = [(cat, sid) for cat in CATEGORIES for sid in fetch_sids(cat)]
 
-                events.append({
-                    "title":             title,
-                    "museum_id":         MUSEUM_ID,
-                    "start_date":        start,
-                    "end_date":          end or start,
-                    "event_description": lead,
-                    "event_url":         detail_url,
-                })
+    # 詳細ページは並列に取得し、結果は targets の順に流す（完了順に依存しない）
+    total = 0
+    with ThreadPoolExecutor(max_workers=DETAIL_CONCURRENCY) as executor:
+        for ev in executor.map(metrics.bind(lambda t: fetch_detail(*t)), targets):
+            if ev:
+                total += 1
+                yield ev
 
-        browser.close()
-    print(f"📦 取得イベント数: {len(events)}")
-    return events
+    print(f"📦 取得イベント数: {total}")
 
 def save_to_supabase(events):
-    for ev in events:
-        ev["title"] = clean_text(ev["title"])
-        existing = supabase.table("events")\
-            .select("id")\
-            .eq("museum_id", ev["museum_id"])\
-            .eq("title", ev["title"])\
-            .eq("start_date", ev["start_date"])\
-            .limit(1).execute()
-        if existing.data:
-            supabase.table("events").update(ev).eq("id", existing.data[0]["id"]).execute()
-            print("🔄 更新:", ev["title"])
-        else:
-            supabase.table("events").insert(ev).execute()
-            print("🆕 登録:", ev["title"])
+    # 詳細ページの取得に失敗したイベントは流れてこないので、消えたイベントの取り下げはしない
+    return sync_events(events, client=get_supabase(ENV_FILE, override=ENV_OVERRIDE))
 
 if __name__ == "__main__":
     evs = fetch_events()
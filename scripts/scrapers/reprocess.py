@@ -0,0 +1,167 @@
+# scripts/scrapers/reprocess.py
+#
+# アーカイブ済みのページ（page_archive）を現在のパーサーで読み直し、イベントを同期し直す
+# パーサーを直したあと、過去数週間分のスナップショットから取りこぼしを埋めるためのもの
+#   python -m scripts.scrapers.reprocess [--since YYYY-MM-DD] [--until YYYY-MM-DD]
+#                                        [--only NAME ...] [--workers N] [--dry-run]
+# museums.json に定義した館（engine.py）も、スクリプトと同じように対象になる
+#
+# BeautifulSoup のパースは CPU 律速なので ProcessPoolExecutor で全コアに分散する。
+# 本文が同じスナップショット（ハッシュが同じ）は 1 回だけパースし、
+# 結果は取得順に EventSink へ流し込むので、同じイベントは新しいスナップショットの内容が残る。
+# 同期先はライブの同期と同じ Supabase にする（スクレイパーの ENV_FILE / ENV_OVERRIDE。
+# m_ スクリプトは .env.test のプロジェクト）。同期先ごとに EventSink を 1 つ作る。
+
+import argparse
+import contextlib
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+SCRAPER_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE_DIR = os.path.abspath(os.path.join(SCRAPER_DIR, "..", ".."))
+sys.path.append(BASE_DIR)
+
+from scripts.scrapers.engine import get_museum, load_museums
+from scripts.scrapers.run_all import discover_scrapers, load_scraper, scraper_name
+from src.lib import page_archive
+from src.lib.date_parser import set_reference_date
+from src.lib.event_sync import EventSink, event_key
+from src.lib.supabase_client import get_supabase
+
+DEFAULT_WORKERS = os.cpu_count() or 1
+CHUNK_SIZE = 8
+# ジョブの参照先が museums.json の館であることを表す接頭辞（それ以外はスクリプトのパス）
+MUSEUM_PREFIX = "museum:"
+
+
+def owns(module, url):
+    """url がこのスクレイパーの parse_events で読めるページか"""
+    pattern = getattr(module, "PAGE_URL_PATTERN", None)
+    if pattern is not None:
+        return pattern.fullmatch(url) is not None
+    return url in {getattr(module, "EVENT_URL", None), getattr(module, "LIST_URL", None)}
+
+
+def sync_target(module):
+    """スクレイパーの同期先（get_supabase に渡す env_file, override）"""
+    return getattr(module, "ENV_FILE", None), getattr(module, "ENV_OVERRIDE", False)
+
+
+def resolve(ref):
+    """ジョブの参照先（スクリプトのパス or museum:館名）からスクレイパーを返す"""
+    if ref.startswith(MUSEUM_PREFIX):
+        return get_museum(ref[len(MUSEUM_PREFIX):])
+    return load_scraper(ref)
+
+
+def plan(paths, since=None, until=None, museums=None):
+    """アーカイブの記録をスクレイパーに割り当て、(参照先, 記録) を取得順に返す"""
+    modules = {}
+    for path in paths:
+        try:
+            module = load_scraper(path)
+        except Exception as e:
+            print(f"⚠️ [{scraper_name(path)}] 読み込み失敗のため対象外: {e}")
+            continue
+        if hasattr(module, "parse_events"):
+            modules[path] = module
+    for name, museum in (museums or {}).items():
+        modules[MUSEUM_PREFIX + name] = museum
+
+    jobs = []
+    seen = set()
+    unmatched = 0
+    for entry in page_archive.iter_entries(since, until):
+        ref = next((r for r, m in modules.items() if owns(m, entry["url"])), None)
+        if ref is None:
+            unmatched += 1
+            continue
+        # 同じ URL・同じ本文・同じ取得日のスナップショットは結果も同じなので 1 回だけ
+        key = (entry["url"], entry["sha256"], page_archive.fetched_on(entry))
+        if key in seen:
+            continue
+        seen.add(key)
+        jobs.append((ref, entry))
+    if unmatched:
+        print(f"ℹ️ 対応するスクレイパーがない記録: {unmatched} 件")
+    return jobs
+
+
+def _quiet_worker():
+    # 各スクレイパーのデバッグ出力でコンソールが埋まらないようにする
+    sys.stdout = open(os.devnull, "w")
+
+
+def parse_snapshot(job):
+    """ワーカープロセス側: 1 スナップショットをパースしてイベントのリストを返す"""
+    ref, entry = job
+    module = resolve(ref)
+    # 年の推測は取得した日を基準にする（今日の日付で読むと年がずれる）
+    set_reference_date(page_archive.fetched_on(entry))
+    try:
+        return module.parse_events(page_archive.read_text(entry), entry["url"])
+    except Exception as e:
+        with contextlib.redirect_stdout(sys.__stdout__):
+            print(f"⚠️ パース失敗: {entry['url']} ({entry['fetched_at']}): {e}")
+        return []
+
+
+def reprocess(jobs, sinks=None, workers=DEFAULT_WORKERS, verbose=False):
+    """スナップショットを並列にパースして sinks[参照先] に流し込み、重複を除いたイベント数を返す"""
+    keys = set()
+    parsed = 0
+    initializer = None if verbose else _quiet_worker
+    with ProcessPoolExecutor(max_workers=max(1, workers), initializer=initializer) as executor:
+        # map は投入順に結果を返すので、後のスナップショットが前のものを上書きする
+        for (ref, _), page_events in zip(jobs, executor.map(parse_snapshot, jobs, chunksize=CHUNK_SIZE)):
+            parsed += 1
+            for ev in page_events:
+                keys.add(event_key(ev))
+                if sinks is not None:
+                    sinks[ref].add(ev)
+    print(f"🧮 {parsed} スナップショットから {len(keys)} 件（重複除去後）")
+    return len(keys)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="アーカイブ済みページを再パースしてイベントを同期し直す")
+    parser.add_argument("--since", help="対象の開始日（YYYY-MM-DD、日本時間）")
+    parser.add_argument("--until", help="対象の終了日（YYYY-MM-DD、日本時間）")
+    parser.add_argument("--only", nargs="*", help="対象のスクリプト名（拡張子なし）または museums.json の館名")
+    parser.add_argument("--skip-museums", action="store_true", help="museums.json の館を対象にしない")
+    parser.add_argument("--pattern", default="*scrape_*.py", help="対象スクリプトの glob パターン")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="パースに使うプロセス数")
+    parser.add_argument("--dry-run", action="store_true", help="パースだけ行い Supabase に同期しない")
+    parser.add_argument("--verbose", action="store_true", help="スクレイパーのデバッグ出力を表示する")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    museums = {} if args.skip_museums else load_museums(only=args.only)
+    jobs = plan(discover_scrapers(args.pattern, args.only), args.since, args.until, museums)
+    if not jobs:
+        print("📭 再処理するスナップショットがありません")
+        return 0
+    print(f"📼 {len(jobs)} スナップショットを {args.workers} プロセスで再パース")
+
+    if args.dry_run:
+        reprocess(jobs, workers=args.workers, verbose=args.verbose)
+        print(f"⏱️ {time.perf_counter() - started:.1f}s")
+        return 0
+
+    # パースしながら書き込みスレッドが upsert を進める
+    # 古いスナップショットなので、取り下げ（withdrawn_at）には触れない（EventSink の既定）
+    targets = {ref: sync_target(resolve(ref)) for ref in {ref for ref, _ in jobs}}
+    with contextlib.ExitStack() as stack:
+        by_target = {
+            target: stack.enter_context(EventSink(get_supabase(*target)))
+            for target in set(targets.values())
+        }
+        reprocess(jobs, {ref: by_target[t] for ref, t in targets.items()}, workers=args.workers, verbose=args.verbose)
+    print(f"⏱️ {time.perf_counter() - started:.1f}s")
+    return 1 if any(sink.counts["errors"] for sink in by_target.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,205 @@
+# scripts/scrapers/run_all.py
+#
+# 全スクレイパーを 1 プロセスでまとめて並列実行するランナー
+# scrape_*.py のスクリプトに加えて、museums.json に定義した館（engine.py）も同じように実行する
+#   python -m scripts.scrapers.run_all [--workers N] [--pattern GLOB] [--only NAME ...] [--skip-museums]
+#   python -m scripts.scrapers.run_all --fetch-mode replay [--replay-date YYYY-MM-DD] [--dry-run]
+#   python -m scripts.scrapers.run_all --due-only   # 変化の頻度から決めた次回予定日を過ぎた館だけ
+
+import argparse
+import glob
+import importlib.util
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date
+
+SCRAPER_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE_DIR = os.path.abspath(os.path.join(SCRAPER_DIR, "..", ".."))
+sys.path.append(BASE_DIR)
+
+from scripts.scrapers.engine import MUSEUMS_PATH, load_museums
+from src.lib import metrics, page_archive, recrawl_schedule
+from src.lib.browser_pool import close_browser_pool
+from src.lib.date_parser import set_reference_date
+from src.lib.http_cache import NotModified
+from src.lib.http_client import close_client
+
+DEFAULT_PATTERN = "scrape_*.py"
+DEFAULT_WORKERS = int(os.environ.get("SCRAPER_WORKERS", "4"))
+
+
+def scraper_name(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def load_scraper(path):
+    # ファイル名にハイフンを含むので importlib で直接読み込む
+    name = scraper_name(path)
+    module_name = "scrapers." + name.replace("-", "_")
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        del sys.modules[module_name]
+        raise
+    return module
+
+
+def discover_scrapers(pattern=DEFAULT_PATTERN, only=None):
+    paths = sorted(glob.glob(os.path.join(SCRAPER_DIR, pattern)))
+    if only:
+        paths = [p for p in paths if scraper_name(p) in only]
+    return paths
+
+
+def _schedule_next(name, observation=None):
+    if observation is None:
+        next_day, interval = recrawl_schedule.record(name)
+    else:
+        next_day, interval = recrawl_schedule.record(name, observation.digest, observation.upcoming)
+    metrics.set_gauge("recrawl_interval_days", interval)
+    print(f"📅 [{name}] 次回の取得予定 {next_day}（{interval} 日後）")
+
+
+def run_scraper(name, module, dry_run=False):
+    started = time.perf_counter()
+    # 同期まで済んだ実際の取得だけを、変化の履歴として残す
+    track = not dry_run and not page_archive.replaying()
+    # このスレッドで記録する計測値には scraper=name が付く
+    with metrics.scope(name):
+        try:
+            try:
+                # fetch_events がジェネレーターなら、取得しながら save_to_supabase 側で書き込みが進む
+                events = module.fetch_events()
+            except NotModified:
+                if track:
+                    _schedule_next(name)
+                raise
+            if dry_run:
+                count = sum(1 for _ in events)
+            else:
+                observation = recrawl_schedule.Observation() if track else None
+                if observation is not None:
+                    events = observation.watch(events)
+                counts = module.save_to_supabase(events) or {}
+                count = counts.get("received", 0)
+                if observation is not None and not counts.get("errors"):
+                    _schedule_next(name, observation)
+        finally:
+            metrics.set_gauge("run_seconds", round(time.perf_counter() - started, 3))
+        metrics.inc("events", count)
+    print(f"📦 [{name}] {count} 件のイベントを処理")
+    return count, time.perf_counter() - started
+
+
+def run_all(paths, workers=DEFAULT_WORKERS, dry_run=False, museums=None, due_only=False, invalid=None):
+    """paths のスクリプトと museums（{name: engine.Museum}）を並列実行し、{name: (状態, 件数, 秒)} を返す
+
+    invalid（load_museums が定義の不備で飛ばした館の名前）は実行せずに error として結果に入れる。
+    """
+    results = {name: ("error", 0, 0.0) for name in invalid or ()}
+
+    # import は副作用を伴うものがあるのでメインスレッドで順番に行う
+    jobs = {}
+    for path in paths:
+        name = scraper_name(path)
+        try:
+            module = load_scraper(path)
+        except Exception:
+            print(f"❌ [{name}] 読み込み失敗\n{traceback.format_exc()}")
+            results[name] = ("error", 0, 0.0)
+            continue
+        if not (hasattr(module, "fetch_events") and hasattr(module, "save_to_supabase")):
+            print(f"⚠️ [{name}] fetch_events / save_to_supabase がないためスキップ")
+            continue
+        jobs[name] = module
+    # 定義ファイルの館もスクリプトと同じ関数を持つので、そのまま並べて実行する
+    jobs.update(museums or {})
+    if due_only:
+        for name in [n for n in jobs if not recrawl_schedule.is_due(n)]:
+            print(f"⏸️ [{name}] 次回の取得予定は {recrawl_schedule.next_due(name)} のため今回は取得しない")
+            del jobs[name]
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {executor.submit(run_scraper, name, module, dry_run): name for name, module in jobs.items()}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                count, elapsed = future.result()
+                results[name] = ("ok", count, elapsed)
+                print(f"✅ [{name}] 完了 ({elapsed:.1f}s)")
+            except NotModified:
+                results[name] = ("skip", 0, 0.0)
+                print(f"⏭️ [{name}] ページに変更がないため同期をスキップ")
+            except Exception:
+                # 1 館の失敗で他の館を止めない
+                results[name] = ("error", 0, 0.0)
+                print(f"❌ [{name}] 失敗\n{traceback.format_exc()}")
+
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="全スクレイパーを並列実行する")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="同時実行数")
+    parser.add_argument("--pattern", default=DEFAULT_PATTERN, help="対象スクリプトの glob パターン")
+    parser.add_argument("--only", nargs="*", help="実行するスクリプト名（拡張子なし）または museums.json の館名")
+    parser.add_argument("--museums", default=None, help="館の定義ファイル（既定は scripts/scrapers/museums.json）")
+    parser.add_argument("--skip-museums", action="store_true", help="museums.json の館を実行しない")
+    parser.add_argument("--fetch-mode", choices=page_archive.MODES, help="record / replay / live（既定は SCRAPER_FETCH_MODE）")
+    parser.add_argument("--replay-date", help="replay 時に使う記録の日付（YYYY-MM-DD、その日までの最新版）")
+    parser.add_argument("--dry-run", action="store_true", help="取得とパースだけ行い Supabase に同期しない")
+    parser.add_argument("--due-only", action="store_true", help="次回の取得予定日を過ぎた館だけを実行する")
+    parser.add_argument("--metrics-dir", help="計測結果（metrics.jsonl / scraper.prom）の出力先")
+    args = parser.parse_args(argv)
+
+    # スクレイパーの import より前にモードを決める
+    if args.fetch_mode or args.replay_date:
+        page_archive.set_mode(args.fetch_mode or page_archive.mode(), args.replay_date)
+    if page_archive.replaying():
+        print("📼 アーカイブから再生（ネットワーク・Chromium は使わない）")
+        # 年のない日付は記録した日を基準に推測する（今日の日付で読むと年がずれる。reprocess と同じ）
+        if page_archive.replay_date():
+            set_reference_date(date.fromisoformat(page_archive.replay_date()))
+
+    paths = discover_scrapers(args.pattern, args.only)
+    # 定義に不備のある館は飛ばして残りを実行し、結果では error にする
+    invalid = {}
+    museums = {} if args.skip_museums else load_museums(args.museums or MUSEUMS_PATH, args.only, invalid)
+    if not paths and not museums and not invalid:
+        print("📭 実行対象のスクレイパーがありません")
+        return 0
+
+    started = time.perf_counter()
+    try:
+        results = run_all(paths, workers=args.workers, dry_run=args.dry_run, museums=museums,
+                          due_only=args.due_only, invalid=invalid)
+    finally:
+        # 全スクレイパーで共有した Chromium と HTTP コネクションをまとめて閉じる
+        close_browser_pool()
+        close_client()
+
+    print("─── 実行結果 ───")
+    for name in sorted(results):
+        status, count, elapsed = results[name]
+        mark = {"ok": "✅", "skip": "⏭️"}.get(status, "❌")
+        print(f"{mark} {name}: {count} 件 ({elapsed:.1f}s)")
+        metrics.set_gauge("up", 0 if status == "error" else 1, scraper=name)
+    print(f"⏱️ 合計 {time.perf_counter() - started:.1f}s")
+
+    metrics.set_gauge("run_seconds", round(time.perf_counter() - started, 3), scraper="(all)")
+    jsonl_path, prom_path = metrics.write_reports(args.metrics_dir)
+    print(f"📈 計測結果: {jsonl_path} / {prom_path}")
+
+    return 1 if any(status == "error" for status, _, _ in results.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
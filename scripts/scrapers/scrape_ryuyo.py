@@ -1,160 +1,142 @@
-import requests
-from bs4 import BeautifulSoup
 import re
-import unicodedata
-from datetime import datetime
-from playwright.sync_api import sync_playwright
 import os
-import json
 import sys
+from concurrent.futures import ThreadPoolExecutor
 
 # ✅ src/lib/supabase_client を使うように修正
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
-from src.lib.supabase_client import supabase
+from src.lib import metrics
+from src.lib.browser_pool import get_browser_pool
+from src.lib.date_parser import parse_date_range
+from src.lib.event_sync import event_key, load_event_index, sync_events
+from src.lib.html_parser import parse_html, strainer
+from src.lib.keyword_filter import load_event_filter
+from src.lib.text_utils import clean_description, clean_text
 
-BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
-with open(os.path.join(BASE_DIR, "exclude_keywords.json"), "r", encoding="utf-8") as f:
-    EXCLUDE_KEYWORDS = json.load(f)
+EVENT_FILTER = load_event_filter()
 
 MUSEUM_ID = "775284cf-d328-429d-b2e7-bbf894158bc9"
-
-def clean_text(text):
-    if not text:
-        return ""
-    text = unicodedata.normalize("NFKC", text)
-    text = re.sub(r"\s+", " ", text)
-    return text.strip()
-
-def remove_duplicate_sentences(text):
-    seen = set()
-    sentences = re.split(r'(?<=[。！？\n])\s*', text)
-    unique_sentences = []
-    for s in sentences:
-        norm = clean_text(s)
-        if norm and norm not in seen:
-            seen.add(norm)
-            unique_sentences.append(s.strip())
-    return " ".join(unique_sentences)
-
-def parse_date_range(text):
-    match = re.findall(r"(\d{1,2})[\/月](\d{1,2})[（(]?[^\d)]*[）)]?", text)
-    if not match:
-        return None, None
-
-    today = datetime.now()
-    current_year = today.year
-
-    def infer_year(month: int):
-        if today.month >= 10 and month <= 3:
-            return current_year + 1
-        return current_year
-
-    start_month, start_day = map(int, match[0])
-    start_year = infer_year(start_month)
-    start = f"{start_year}/{start_month:02d}/{start_day:02d}"
-
-    if len(match) > 1:
-        end_month, end_day = map(int, match[1])
-        end_year = infer_year(end_month)
-        end = f"{end_year}/{end_month:02d}/{end_day:02d}"
-    else:
-        end = start
-
-    return start, end
-
-def fetch_events():
+EVENT_URL = "https://ryu-yo.jp/event/"
+ITEM_SELECTOR = "li.eventArchiveList--item"
+# アーカイブからの再処理で parse_events に渡すページ（一覧の 1 ページ目と /page/N/）
+PAGE_URL_PATTERN = re.compile(re.escape(EVENT_URL) + r"(page/\d+/)?")
+PAGE_CONCURRENCY = int(os.getenv("RYUYO_PAGE_CONCURRENCY", "4"))
+# 1 にするとアーカイブ全ページを取得する（既定は既知イベントだけのページで打ち切る差分取得）
+FULL_CRAWL = os.getenv("RYUYO_FULL_CRAWL") == "1"
+
+def page_url(page_num):
+    return f"{EVENT_URL}page/{page_num}/" if page_num > 1 else EVENT_URL
+
+def count_pages(soup):
+    # ページャーのリンク（/event/page/N/）から最終ページ番号を求める
+    last = 1
+    for a in soup.find_all("a", href=True):
+        m = re.search(r"/event/page/(\d+)/?", a["href"])
+        if m:
+            last = max(last, int(m.group(1)))
+    return last
+
+def parse_page(soup, url):
     events = []
-    with sync_playwright() as p:
-        browser = p.chromium.launch()
-        page = browser.new_page()
-
-        page_num = 1
-        while True:
-            url = f"https://ryu-yo.jp/event/page/{page_num}/" if page_num > 1 else "https://ryu-yo.jp/event/"
-            print(f"🌐 ページ取得中: {url}")
-            page.goto(url)
-            try:
-                page.wait_for_selector("li.eventArchiveList--item", timeout=5000)
-            except:
-                print("⛔️ イベントセレクタが見つからなかったため、終了")
-                break
+    items = soup.find_all("li", class_="eventArchiveList--item")
+    print(f"🧪 {url}: イベント数 = {len(items)}")
+
+    for item in items:
+        title_el = item.select_one("h3.title")
+        date_el = item.select_one("dl .dl-row:nth-of-type(1) dd")
+        description_el = item.select_one("p.mb30")
+
+        title = clean_text(title_el.text if title_el else "")
+        date_text = clean_text(date_el.text if date_el else "")
+        description = clean_description(description_el.text if description_el else "")
+
+        excluded = EVENT_FILTER.excluded_by(title)
+        if excluded:
+            print(f"⚠️ 除外ワード検出（{excluded}）→ スキップ: {title}")
+            continue
+
+        print(f"📝 タイトル: {title}")
+        print(f"📅 日付テキスト: {date_text}")
+
+        start_date, end_date = parse_date_range(date_text)
+        print(f"➡️ パース結果: start={start_date}, end={end_date}")
+
+        if title and start_date:
+            events.append({
+                "title": title,
+                "museum_id": MUSEUM_ID,
+                "start_date": start_date,
+                "end_date": end_date,
+                "event_description": description,
+                "event_url": url,
+            })
+        elif title:
+            metrics.inc("events_skipped", reason="date")
 
-            html = page.content()
-            soup = BeautifulSoup(html, "html.parser")
+    return events
 
-            items = soup.find_all("li", class_="eventArchiveList--item")
-            if not items:
-                print("📭 イベントが見つかりませんでした。ページ終了。")
+def parse_soup(html):
+    # イベント項目とページャーのリンクだけを木にする
+    return parse_html(html, only=strainer(["li", "a"]))
+
+def parse_events(html, url=EVENT_URL):
+    return parse_page(parse_soup(html), url)
+
+def fetch_soup(url):
+    print(f"🌐 ページ取得中: {url}")
+    html = get_browser_pool().fetch_html(url, wait_for=ITEM_SELECTOR, timeout=5000, owner=MUSEUM_ID)
+    return parse_soup(html)
+
+def fetch_page_events(page_num):
+    url = page_url(page_num)
+    try:
+        return parse_page(fetch_soup(url), url)
+    except Exception as e:
+        print(f"⚠️ ページ取得失敗: {url} ({e})")
+        return []
+
+def load_known_keys():
+    try:
+        return set(load_event_index(MUSEUM_ID))
+    except Exception as e:
+        print(f"⚠️ 既存イベントの取得に失敗したため全ページ取得に切り替え: {e}")
+        return None
+
+def fetch_pages(full=FULL_CRAWL):
+    """ページごとのイベントのリストをページ順に返すジェネレーター"""
+    soup = fetch_soup(EVENT_URL)
+    last_page = count_pages(soup)
+    page_events = parse_page(soup, EVENT_URL)
+    print(f"📚 全 {last_page} ページ")
+    yield page_events
+
+    known = None if full else load_known_keys()
+    if known is None:
+        # 全ページ取得: 2 ページ目以降を並列に取得し、ページ順に流す
+        with ThreadPoolExecutor(max_workers=PAGE_CONCURRENCY) as executor:
+            yield from executor.map(metrics.bind(fetch_page_events), range(2, last_page + 1))
+    else:
+        # 差分取得: 既知のイベントしか載っていないページに達したら打ち切る
+        page_num = 1
+        while page_num < last_page:
+            if page_events and all(event_key(ev) in known for ev in page_events):
+                print(f"⏹️ ページ {page_num} は既知のイベントのみ → 以降は取得しない")
                 break
-
-            print(f"🧪 ページ {page_num}: イベント数 = {len(items)}")
-
-            for item in items:
-                title_el = item.select_one("h3.title")
-                date_el = item.select_one("dl .dl-row:nth-of-type(1) dd")
-                description_el = item.select_one("p.mb30")
-
-                title = clean_text(title_el.text if title_el else "")
-                date_text = clean_text(date_el.text if date_el else "")
-                description = clean_text(description_el.text if description_el else "")
-                description = remove_duplicate_sentences(description)
-
-                if any(kw in title for kw in EXCLUDE_KEYWORDS):
-                    print(f"⚠️ 除外ワード検出 → スキップ: {title}")
-                    continue
-
-                print(f"📝 タイトル: {title}")
-                print(f"📅 日付テキスト: {date_text}")
-
-                start_date, end_date = parse_date_range(date_text)
-                print(f"➡️ パース結果: start={start_date}, end={end_date}")
-
-                if title and start_date:
-                    events.append({
-                        "title": title,
-                        "museum_id": MUSEUM_ID,
-                        "start_date": start_date,
-                        "end_date": end_date,
-                        "event_description": description,
-                        "event_url": url,
-                    })
-
             page_num += 1
+            page_events = fetch_page_events(page_num)
+            yield page_events
 
-        browser.close()
-
-    print(f"📦 全ページ合計イベント数: {len(events)}")
-    return events
+def fetch_events(full=FULL_CRAWL):
+    """イベントを 1 件ずつ返すジェネレーター（ページを取得した順に流れる）"""
+    total = 0
+    for page_events in fetch_pages(full):
+        total += len(page_events)
+        yield from page_events
+    print(f"📦 全ページ合計イベント数: {total}")
 
 def save_to_supabase(events):
-    for event in events:
-        normalized_title = clean_text(event["title"])
-        event["title"] = normalized_title
-
-        existing = supabase.table("events")\
-            .select("id")\
-            .eq("museum_id", event["museum_id"])\
-            .eq("title", event["title"])\
-            .eq("start_date", event["start_date"])\
-            .limit(1)\
-            .execute()
-
-        if existing.data and len(existing.data) > 0:
-            event_id = existing.data[0]["id"]
-            result = supabase.table("events").update(event).eq("id", event_id).execute()
-            action = "🔄 更新完了"
-        else:
-            result = supabase.table("events").insert(event).execute()
-            action = "🆕 新規登録"
-
-        if hasattr(result, "data") and result.data:
-            print(f"{action}: {event['title']}")
-        elif hasattr(result, "status_code") and result.status_code >= 400:
-            print(f"❌ エラー: {event['title']} (HTTP {result.status_code})")
-        else:
-            print(f"⚠️ 不明な状態: {event['title']}")
+    # 差分取得は一覧の一部しか見ず、全ページ取得も失敗したページを飛ばすので、消えたイベントの取り下げはしない
+    return sync_events(events)
 
 if __name__ == "__main__":
-    events = fetch_events()
-    print(f"📦 {len(events)} 件のイベントを取得")
-    save_to_supabase(events)
+    save_to_supabase(fetch_events())
@@ -197,7 +197,9 @@ export default function HomePage() {
         .from('events')
         .select(
           '*, insect_museums(id, name, name_kana,latitude, longitude, address, address_kana,area,area_kana,prefecture,prefecture_kana)',
-        );
+        )
+        // 館のページから消えた（中止・取り下げ）イベントは表示しない
+        .is('withdrawn_at', null);
 
       if (museumData) {
         setMuseums(museumData);
@@ -0,0 +1,275 @@
+# src/lib/browser_pool.py
+#
+# Playwright の Chromium を 1 実行につき 1 回だけ起動してスクレイパー間で共有する
+# 専用スレッドのイベントループ上で async API を動かすので、
+# run_all のどのワーカースレッドからでも fetch_html() を呼べる
+# 取得した HTML は page_archive に記録し、replay モードでは Chromium を起動せずアーカイブから返す
+# 画像・フォント・CSS・解析タグなどイベント情報に不要なリクエストは page.route で中断する（ResourcePolicy）
+# 同時ページ数（BROWSER_MAX_PAGES）とホストごとの頻度は host_scheduler が管理する
+
+import asyncio
+import atexit
+import os
+import threading
+from urllib.parse import urlsplit
+
+from src.lib import metrics, page_archive
+from src.lib.host_scheduler import BROWSER_CONCURRENCY, get_scheduler, retry_after_seconds
+
+DEFAULT_PAGES_PER_CONTEXT = int(os.environ.get("BROWSER_PAGES_PER_CONTEXT", "20"))
+DEFAULT_TIMEOUT = 30000
+# 0 にするとリクエストの中断を全館で止める（描画が崩れていないか確かめるとき用）
+BLOCK_RESOURCES = os.environ.get("BROWSER_BLOCK_RESOURCES", "1") != "0"
+
+# 中断する resource_type（Playwright の request.resource_type）
+DEFAULT_BLOCKED_TYPES = frozenset({"image", "media", "font", "stylesheet"})
+# 解析・広告・SNS 埋め込みのドメイン（サブドメインも含む）
+TRACKER_DOMAINS = frozenset({
+    "google-analytics.com", "googletagmanager.com", "doubleclick.net",
+    "googlesyndication.com", "googleadservices.com", "facebook.net",
+    "connect.facebook.com", "platform.twitter.com", "ads-twitter.com",
+    "clarity.ms", "hotjar.com", "yjtag.jp", "yahoo-net.jp",
+})
+# first_party_only でも止めない、よく使われるライブラリ配信元
+COMMON_CDN_DOMAINS = frozenset({
+    "ajax.googleapis.com", "code.jquery.com", "cdnjs.cloudflare.com",
+    "cdn.jsdelivr.net", "unpkg.com",
+})
+# 登録ドメインが 3 ラベルになる .jp の第 2 レベル（example.or.jp など）
+_JP_SECOND_LEVEL = {"ac", "ad", "co", "ed", "go", "gr", "lg", "ne", "or"}
+
+
+def _site(host):
+    """ホスト名から登録ドメインを大まかに取り出す（www.seibutuen.jp → seibutuen.jp）"""
+    labels = host.lower().split(".")
+    n = 3 if len(labels) >= 3 and labels[-1] == "jp" and labels[-2] in _JP_SECOND_LEVEL else 2
+    return ".".join(labels[-n:])
+
+
+def _matches(host, domains):
+    return any(host == d or host.endswith("." + d) for d in domains)
+
+
+class ResourcePolicy:
+    """page.route で中断するリクエストの方針（館ごとに fetch_html(policy=...) で変えられる）
+
+    block_types: 中断する resource_type
+    block_domains: 中断するドメイン（サブドメインも含む）
+    first_party_only: True ならページと別サイトへのリクエストを allow_domains 以外すべて中断する
+    ページ本体（メインフレームの遷移）は中断しない。
+    """
+
+    def __init__(self, block_types=DEFAULT_BLOCKED_TYPES, block_domains=TRACKER_DOMAINS,
+                 first_party_only=False, allow_domains=COMMON_CDN_DOMAINS):
+        self.block_types = frozenset(block_types)
+        self.block_domains = frozenset(block_domains)
+        self.first_party_only = first_party_only
+        self.allow_domains = frozenset(allow_domains)
+
+    @property
+    def blocks_nothing(self):
+        return not self.block_types and not self.block_domains and not self.first_party_only
+
+    def blocks(self, resource_type, url, page_url):
+        """page_url を開いている途中の url へのリクエストを中断するか"""
+        if resource_type in self.block_types:
+            return True
+        host = (urlsplit(url).hostname or "").lower()
+        if not host:
+            # data: / blob: などはネットワークに出ない
+            return False
+        if _matches(host, self.block_domains):
+            return True
+        if self.first_party_only and _site(host) != _site(urlsplit(page_url).hostname or ""):
+            return not _matches(host, self.allow_domains)
+        return False
+
+
+DEFAULT_POLICY = ResourcePolicy()
+ALLOW_ALL = ResourcePolicy(block_types=(), block_domains=())
+
+
+class BrowserPool:
+    def __init__(self, pages_per_context=DEFAULT_PAGES_PER_CONTEXT, headless=True):
+        self.pages_per_context = pages_per_context
+        self.headless = headless
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+        self._playwright = None
+        self._browser = None
+        # (owner, user_agent) → {"context", "used", "active"}
+        self._contexts = {}
+        self._retired = []
+
+    # ── スレッド側から呼ぶ API ──
+
+    def fetch_html(self, url, wait_for=None, wait_until="load", timeout=DEFAULT_TIMEOUT, user_agent=None, owner=None,
+                   policy=None):
+        """url を開き、wait_for のセレクタが現れた時点の HTML を返す
+
+        timeout は wait_for の待ち時間（ミリ秒）。ページ遷移自体は DEFAULT_TIMEOUT まで待つ。
+        owner（館ごとの ID など）と user_agent が同じ呼び出しは同じ BrowserContext を共有する。
+        policy（ResourcePolicy）を省略すると DEFAULT_POLICY で画像・フォント・CSS・解析タグを止める。
+        """
+        host = urlsplit(url).netloc
+        if page_archive.replaying():
+            _, body = page_archive.replay(url, "browser")
+            metrics.inc("pages_fetched", kind="replay", host=host)
+            return body.decode("utf-8")
+        self._ensure_started()
+        # 枠はこのスレッドで待つ（ブラウザ側のイベントループは止めない）
+        # run_coroutine_threadsafe は呼び出し元の contextvars を引き継ぐので、
+        # ブラウザ側のスレッドで記録した値にも呼び出し元の scraper ラベルが付く
+        try:
+            with get_scheduler().slot(url, "browser"):
+                html, status, headers = self._run(
+                    self._fetch_html(url, wait_for, wait_until, timeout, user_agent, owner, policy or DEFAULT_POLICY)
+                )
+        except Exception as e:
+            metrics.inc("browser_errors", reason=e.__class__.__name__, host=host)
+            raise
+        if status in (429, 503):
+            retry_after = retry_after_seconds(headers.get("retry-after"))
+            if retry_after is not None:
+                get_scheduler().defer(url, retry_after)
+        metrics.inc("pages_fetched", kind="browser", host=host)
+        metrics.inc("fetched_bytes", len(html.encode("utf-8")), kind="browser", host=host)
+        page_archive.record(url, html, "browser", status=status, headers=headers)
+        return html
+
+    def close(self):
+        with self._lock:
+            if self._loop is None:
+                return
+            try:
+                self._run(self._close())
+            finally:
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._thread.join()
+                self._loop.close()
+                self._loop = None
+                self._thread = None
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._loop is not None:
+                return
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="browser-pool", daemon=True)
+            thread.start()
+            self._loop, self._thread = loop, thread
+            try:
+                self._run(self._start())
+            except BaseException:
+                loop.call_soon_threadsafe(loop.stop)
+                thread.join()
+                loop.close()
+                self._loop, self._thread = None, None
+                raise
+
+    def _run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    # ── ここから下はブラウザ用スレッドのイベントループ上で動く ──
+
+    async def _start(self):
+        from playwright.async_api import async_playwright
+
+        # 起動は全スクレイパーで共有するので、最初に呼んだ館のラベルは付けない
+        with metrics.timer("browser_launch", scraper=None):
+            self._playwright = await async_playwright().start()
+            self._browser = await self._playwright.chromium.launch(headless=self.headless)
+        print(f"🌐 Chromium 起動 (最大 {BROWSER_CONCURRENCY} ページ同時)")
+
+    async def _close(self):
+        for entry in list(self._contexts.values()) + self._retired:
+            await entry["context"].close()
+        self._contexts.clear()
+        self._retired.clear()
+        if self._browser:
+            await self._browser.close()
+        if self._playwright:
+            await self._playwright.stop()
+        self._browser = None
+        self._playwright = None
+
+    async def _acquire_context(self, key, user_agent):
+        entry = self._contexts.get(key)
+        if entry is not None and entry["used"] >= self.pages_per_context:
+            # 使い回し上限に達したコンテキストは新規に置き換え、使用中ページが閉じたら破棄する
+            self._retired.append(entry)
+            entry = None
+        if entry is None:
+            options = {"user_agent": user_agent} if user_agent else {}
+            entry = {"context": await self._browser.new_context(**options), "used": 0, "active": 0}
+            self._contexts[key] = entry
+        entry["used"] += 1
+        entry["active"] += 1
+        return entry
+
+    async def _release_context(self, entry):
+        entry["active"] -= 1
+        if entry["active"] == 0 and entry in self._retired:
+            self._retired.remove(entry)
+            await entry["context"].close()
+
+    async def _route(self, page, url, policy):
+        """policy に当たるリクエストを中断するハンドラーをページに登録する"""
+        if not BLOCK_RESOURCES or policy.blocks_nothing:
+            return
+        host = urlsplit(url).netloc
+
+        async def handle(route):
+            request = route.request
+            if request.is_navigation_request() and request.frame.parent_frame is None:
+                # ページ本体（リダイレクト先を含む）は常に通す
+                await route.continue_()
+            elif policy.blocks(request.resource_type, request.url, url):
+                metrics.inc("blocked_requests", type=request.resource_type, host=host)
+                await route.abort("blockedbyclient")
+            else:
+                await route.continue_()
+
+        await page.route("**/*", handle)
+
+    async def _fetch_html(self, url, wait_for, wait_until, timeout, user_agent, owner, policy):
+        host = urlsplit(url).netloc
+        entry = await self._acquire_context((owner, user_agent), user_agent)
+        page = await entry["context"].new_page()
+        try:
+            await self._route(page, url, policy)
+            with metrics.timer("navigation", host=host):
+                response = await page.goto(url, wait_until=wait_until, timeout=DEFAULT_TIMEOUT)
+            if wait_for:
+                with metrics.timer("wait_for_selector", host=host):
+                    await page.wait_for_selector(wait_for, timeout=timeout)
+            html = await page.content()
+            if response is None:
+                return html, 200, {}
+            return html, response.status, await response.all_headers()
+        finally:
+            await page.close()
+            await self._release_context(entry)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_browser_pool():
+    """プロセス共有の BrowserPool を返す（Chromium は最初の fetch_html で起動）"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BrowserPool()
+            atexit.register(close_browser_pool)
+        return _pool
+
+
+def close_browser_pool():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close()
@@ -0,0 +1,146 @@
+# src/lib/date_parser.py
+#
+# スクレイパー共通の日付（期間）パーサー
+# 「2025年5月3日」「令和7年5月3日」「5月3日(土)～6日(火)」「5/3」「12/20～1/10」などを
+# 先頭と末尾の日付に分解し、どのスクレイパーでも YYYY/MM/DD 形式で返す。
+# 年がない日付は実行ごとに 1 つだけ決める基準日（日本時間の今日）から推測し、
+# 結果は生の文字列と基準日をキーにキャッシュする。
+# 速さのため NFKC 正規化はせず、全角の数字（\d が一致する）・記号は正規表現の文字クラスに含めて扱う。
+# 別々の日付の列挙（5月3日、10日、17日、24日）は、events が開始日・終了日しか持たないので
+# 最初から最後までの 1 つの期間（5/3〜5/24）として返す。
+# 期間・列挙としてつなぐのは、範囲・列挙の区切り（～・、など）だけをはさんだ日付まで。
+# 間に別の文字がある日付（「～8月31日 8月11日は開館」「※5月5日は休館」）はただの注記として読まない。
+
+import os
+import re
+from calendar import isleap
+from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache
+
+JST = timezone(timedelta(hours=9))
+DATE_FORMAT = "%Y/%m/%d"
+ERA_OFFSETS = {"令和": 2018, "平成": 1988}
+
+_ERA = re.compile(r"(令和|平成)\s*(元|\d{1,2})\s*年")
+# 日付をつなぐ区切り（範囲・列挙）と、区切りの前後に入ってよい空白
+SEPARATORS = "~〜～-－–・、,，"
+_SPACES = " \t\r\n\u3000"
+_JOINERS = SEPARATORS + _SPACES
+# DATE_FORMAT と同じ形は 0 埋めした月・日の表から組み立てる（strftime や % 書式より速い）
+_PADDED = tuple(f"{n:02d}" for n in range(32))
+# 月ごとの最大の日数（2 月 29 日はうるう年かどうかを別に確かめる）
+_MONTH_DAYS = (0, 31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+# グループの順は _parse の展開順（findall がこの順のタプルを返す）
+# 先頭のグループは前の日付（または文字列の先頭）からこの日付までの間の文字列
+# 日付の直後の曜日・祝日の括弧（(土)・（月・祝）・(5月5日は休館)）は日付の一部として読み飛ばす
+_TOKEN = re.compile(
+    r"(.*?)(?:"
+    # 年月日（2025年5月3日 / 2025/5/3 / 2025-05-03）
+    r"(\d{4})\s*[年/.\-／．－]\s*(\d{1,2})\s*[月/.\-／．－]\s*(\d{1,2})\s*日?"
+    # 月日（5月3日 / 5/3）
+    r"|(\d{1,2})\s*[月/／]\s*(\d{1,2})\s*日?"
+    # 月を省いた日（5月3日～6日 の「～6日」、3日・4日 の「・4日」）
+    r"|[~〜～\-－–・、,，]\s*(\d{1,2})\s*日"
+    r")(?:\s*[(（][^)）]*[)）])?",
+    re.DOTALL,
+)
+
+_reference = None
+
+
+def reference_date():
+    """年の推測に使う基準日。SCRAPER_REFERENCE_DATE（YYYY-MM-DD）があればそれを使う"""
+    global _reference
+    if _reference is None:
+        env = os.environ.get("SCRAPER_REFERENCE_DATE")
+        _reference = date.fromisoformat(env) if env else datetime.now(JST).date()
+    return _reference
+
+
+def set_reference_date(value):
+    global _reference
+    _reference = value
+
+
+def infer_year(month, ref):
+    # 10 月以降に 1〜3 月の日付が出てきたら翌年のものとみなす
+    if ref.month >= 10 and month <= 3:
+        return ref.year + 1
+    return ref.year
+
+
+def year_epoch(ref=None):
+    """年の推測結果が変わらない期間の識別子（infer_year は基準日の年と 10 月以降かどうかだけで決まる）"""
+    ref = ref or reference_date()
+    return f"{ref.year}-{'late' if ref.month >= 10 else 'early'}"
+
+
+def _era_to_year(m):
+    era_year = 1 if m.group(2) == "元" else int(m.group(2))
+    return f"{ERA_OFFSETS[m.group(1)] + era_year}年"
+
+
+def _normalize(text):
+    # 置換は和暦があるときだけ（たいていの日付は含まない）
+    if "令和" in text or "平成" in text:
+        text = _ERA.sub(_era_to_year, text)
+    return text
+
+
+def _format(year, month, day):
+    return f"{year}/{_PADDED[month]}/{_PADDED[day]}"
+
+
+@lru_cache(maxsize=4096)
+def _parse(text, ref):
+    # 日付は (年, 月, 日) のタプルで扱う（date を作るより速く、そのまま比較・整形できる）
+    first = last = None
+    for gap, y, ym, yd, m, d, od in _TOKEN.findall(_normalize(text)):
+        if last is not None:
+            # 2 つ目以降は区切りだけでつながった日付に限る（注記の日付で期間を伸ばさない）
+            # 月を省いた日は区切りをトークン自身が含むので、あいだは空白だけ
+            rest = gap.strip(_SPACES)
+            if y or m:
+                if not rest or rest.strip(_JOINERS):
+                    break
+            elif rest:
+                break
+        if y:
+            year, month, day = int(y), int(ym), int(yd)
+        elif m:
+            month, day = int(m), int(d)
+            if last is None:
+                year = infer_year(month, ref)
+            else:
+                # 範囲の後半は前の日付の年を引き継ぎ、10〜12 月から 1〜3 月に戻ったときだけ年をまたいだとみなす
+                year = last[0] + 1 if last[1] >= 10 and month <= 3 else last[0]
+        elif last is None:
+            continue
+        else:
+            year, month, day = last[0], last[1], int(od)
+        # 存在しない日付（2月30日 など）は読み飛ばす
+        if not (year and 0 < month < 13 and 0 < day <= _MONTH_DAYS[month]):
+            continue
+        if month == 2 and day == 29 and not isleap(year):
+            continue
+        if first is None:
+            first = (year, month, day)
+        last = (year, month, day)
+
+    if first is None:
+        return None, None
+    if last < first:
+        first, last = last, first
+    start = _format(*first)
+    return start, (start if last == first else _format(*last))
+
+
+def parse_date_range(text, ref=None):
+    """text から (開始日, 終了日) を返す。日付がなければ (None, None)"""
+    if not text:
+        return None, None
+    return _parse(text, ref or reference_date())
+
+
+def parse_date(text, ref=None):
+    return parse_date_range(text, ref)[0]
@@ -0,0 +1,308 @@
+# src/lib/event_sync.py
+#
+# スクレイパー共通の Supabase 同期処理
+# events テーブルの (museum_id, title, start_date) 一意制約を衝突キーにして
+# 1 館分のイベントをまとめて upsert する
+# 既存行は館ごとに 1 回だけ読み込み、書き込む列のハッシュが変わった行だけを送る
+# EventSink はイベントを 1 件ずつ受け取り、chunk_size 件か flush_interval 秒ごとに
+# 別スレッドで書き込むので、ジェネレーターを渡せばクロールと DB 書き込みが並行して進む
+# reconcile=True のときは、今回取得できなかった今後のイベント（終了日が今日以降）に
+# withdrawn_at を付けて取り下げる（館ごとの差分を 1 回の update でまとめて送る）
+#  - 取得が例外で終わった・書き込みエラーがあった実行、アーカイブの再生（replay）では行わない
+#  - 消える件数が多すぎる館は取得の失敗を疑って見送る（MAX_WITHDRAW_RATIO）
+#  - restore_withdrawn=True のときは、再び掲載されたイベントの withdrawn_at を upsert で null に戻す
+#    （ライブの取得だけで指定する。reprocess の古いスナップショットで取り下げを戻さない）
+# タイトルは clean_text で正規化してから送る。既存行も 20261017000010_events_normalize_titles.sql で同じ形に揃えてあるので、
+# 一意制約が比べる生のタイトルと索引のキーが一致する
+# （制約・列は supabase/migrations/ の 20261017000000_events_unique_key.sql と 20261017000100_events_withdrawn_at.sql）
+
+import hashlib
+import os
+import queue
+import threading
+from datetime import datetime, timezone
+
+from src.lib import metrics, page_archive
+from src.lib.date_parser import JST
+from src.lib.supabase_client import get_supabase
+from src.lib.text_utils import clean_text
+
+EVENTS_TABLE = "events"
+CONFLICT_COLUMNS = "museum_id,title,start_date"
+DEFAULT_CHUNK_SIZE = 500
+FLUSH_INTERVAL = 2.0
+# 書き込み待ちのバッチがこれ以上たまったら add() を待たせる（メモリを一定に保つ）
+MAX_QUEUED_BATCHES = 4
+SELECT_PAGE_SIZE = 1000
+HASHED_COLUMNS = ("title", "start_date", "end_date", "event_description", "event_url")
+DATE_COLUMNS = ("start_date", "end_date")
+# 1 館の今後のイベントのうち、この割合を超えて消えたら取り下げない（一覧の取得失敗・構造変更の疑い）
+MAX_WITHDRAW_RATIO = float(os.environ.get("EVENT_WITHDRAW_MAX_RATIO", "0.5"))
+# 今後のイベントが少ない館でも、この件数までは割合に関係なく取り下げる
+WITHDRAW_FREE_COUNT = 2
+
+
+def normalize_date(value):
+    # スクレイパーは YYYY/MM/DD、DB からは YYYY-MM-DD で返ってくるので揃える
+    if not value:
+        return ""
+    return str(value)[:10].replace("/", "-")
+
+
+def event_key(event):
+    return (event["museum_id"], clean_text(event["title"]), normalize_date(event["start_date"]))
+
+
+def content_hash(event):
+    values = []
+    for column in HASHED_COLUMNS:
+        value = event.get(column)
+        if column in DATE_COLUMNS:
+            value = normalize_date(value)
+        values.append("" if value is None else str(value))
+    return hashlib.sha1("\x1f".join(values).encode("utf-8")).hexdigest()
+
+
+def _get_client(client):
+    if client is not None:
+        return client
+    return get_supabase()
+
+
+def _chunks(rows, size):
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+
+def load_event_index(museum_id, client=None):
+    """museum_id の既存イベントを {キー: {"id", "hash", "last", "withdrawn"}} で返す
+
+    last は終了日（なければ開始日）。withdrawn は取り下げ済みかどうか。
+    """
+    client = _get_client(client)
+    index = {}
+    offset = 0
+    while True:
+        with metrics.timer("db_select"):
+            res = client.table(EVENTS_TABLE)\
+                .select("id,museum_id,withdrawn_at," + ",".join(HASHED_COLUMNS))\
+                .eq("museum_id", museum_id)\
+                .order("id")\
+                .range(offset, offset + SELECT_PAGE_SIZE - 1)\
+                .execute()
+        rows = res.data or []
+        for row in rows:
+            index[event_key(row)] = {
+                "id": row["id"],
+                "hash": content_hash(row),
+                "last": normalize_date(row.get("end_date") or row["start_date"]),
+                "withdrawn": row.get("withdrawn_at") is not None,
+            }
+        if len(rows) < SELECT_PAGE_SIZE:
+            return index
+        offset += SELECT_PAGE_SIZE
+
+
+class EventSink:
+    """イベントを少しずつ受け取り、まとまった分を別スレッドで upsert する
+
+    途中でクロールが失敗しても、それまでに add() した分は close() で書き込まれる。
+    同じキーのイベントはこの実行で最後に受け取った内容を採用する。
+    reconcile=True は、受け取ったイベントが館の一覧の全件であるときだけ指定する。
+    restore_withdrawn=False（既定）では withdrawn_at に触れず、取り下げ済みで内容が同じ行は送らない。
+    replay 中はどちらも無効（過去のスナップショットで今の取り下げを付け外ししない）。
+    """
+
+    def __init__(self, client=None, chunk_size=DEFAULT_CHUNK_SIZE, flush_interval=FLUSH_INTERVAL,
+                 reconcile=False, restore_withdrawn=False):
+        self.client = _get_client(client)
+        self.chunk_size = chunk_size
+        self.flush_interval = flush_interval
+        self._replaying = page_archive.replaying()
+        self.reconcile = reconcile
+        self.restore_withdrawn = restore_withdrawn and not self._replaying
+        self.counts = {"received": 0, "inserted": 0, "updated": 0, "unchanged": 0, "withdrawn": 0, "errors": 0}
+        self._pending = {}
+        # この実行で処理済みのキー → ハッシュ（同じ内容を 2 度送らない）
+        self._seen = {}
+        # museum_id → 既存イベントの索引（館ごとに最初のバッチで読み込む）
+        self._index = {}
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=MAX_QUEUED_BATCHES)
+        # 書き込みスレッドで記録する値にも、作成元のスクレイパー名を付ける
+        self._writer = threading.Thread(target=metrics.bind(self._run), name="event-sink", daemon=True)
+        self._writer.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # 取得が途中で失敗したときは一覧の全件がそろっていないので、取り下げはしない
+        if exc_type is not None:
+            self.reconcile = False
+        self.close()
+        return False
+
+    def add(self, event):
+        event["title"] = clean_text(event["title"])
+        key = event_key(event)
+        with self._lock:
+            self.counts["received"] += 1
+            # 1 回の upsert 内で同じ行を 2 度更新すると Postgres がエラーにするので、バッチ内は後勝ちで 1 行に
+            self._pending[key] = event
+            if len(self._pending) < self.chunk_size:
+                return
+            batch, self._pending = self._pending, {}
+        self._queue.put(batch)
+
+    def extend(self, events):
+        for event in events:
+            self.add(event)
+
+    def close(self):
+        """残りを書き込んで書き込みスレッドを止め、件数を返す"""
+        if self._writer.is_alive():
+            with self._lock:
+                batch, self._pending = self._pending, {}
+            if batch:
+                self._queue.put(batch)
+            self._queue.put(None)
+            self._writer.join()
+            counts = self.counts
+            if self.reconcile and self._replaying:
+                print("📼 アーカイブの再生なので、消えたイベントの取り下げはしない")
+            elif self.reconcile and not counts["errors"]:
+                self._withdraw_missing()
+            for result in ("inserted", "updated", "unchanged", "withdrawn", "errors"):
+                metrics.inc("db_rows", counts[result], result=result)
+            print(
+                f"📊 新規 {counts['inserted']} 件 / 更新 {counts['updated']} 件 / "
+                f"変更なし {counts['unchanged']} 件 / 取り下げ {counts['withdrawn']} 件 / "
+                f"エラー {counts['errors']} 件"
+            )
+        return self.counts
+
+    def _missing_ids(self):
+        """館ごとに、今回受け取らなかった今後のイベントの id を集める（多すぎる館は除く）"""
+        today = datetime.now(JST).date().isoformat()
+        received = {}
+        for key in self._seen:
+            received.setdefault(key[0], set()).add(key)
+
+        ids = []
+        for museum_id, keys in received.items():
+            upcoming = {
+                key: row for key, row in self._index.get(museum_id, {}).items()
+                if row["id"] is not None and not row["withdrawn"] and row["last"] >= today
+            }
+            missing = [row["id"] for key, row in upcoming.items() if key not in keys]
+            if not missing:
+                continue
+            if len(missing) > WITHDRAW_FREE_COUNT and len(missing) > len(upcoming) * MAX_WITHDRAW_RATIO:
+                metrics.inc("withdraw_refused")
+                print(
+                    f"🛑 {museum_id}: 今後のイベント {len(upcoming)} 件中 {len(missing)} 件が見つからないため"
+                    f"取り下げを見送り（取得の失敗を疑う）"
+                )
+                continue
+            ids.extend(missing)
+        return ids
+
+    def _withdraw_missing(self):
+        ids = self._missing_ids()
+        if not ids:
+            return
+        withdrawn_at = datetime.now(timezone.utc).isoformat()
+        try:
+            with metrics.timer("db_withdraw"):
+                self.client.table(EVENTS_TABLE)\
+                    .update({"withdrawn_at": withdrawn_at})\
+                    .in_("id", ids)\
+                    .execute()
+        except Exception as e:
+            self.counts["errors"] += len(ids)
+            print(f"❌ 取り下げエラー ({len(ids)} 件): {e}")
+            return
+        self.counts["withdrawn"] += len(ids)
+        print(f"🗑️ ページから消えた今後のイベント {len(ids)} 件を取り下げ")
+
+    # ── ここから下は書き込みスレッドで動く ──
+
+    def _run(self):
+        while True:
+            try:
+                batch = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                # 一定時間たまった分も書き込み、クロールが遅くても DB への反映を待たせない
+                with self._lock:
+                    batch, self._pending = self._pending, {}
+                if not batch:
+                    continue
+            if batch is None:
+                return
+            try:
+                self._write(batch)
+            except Exception as e:
+                self.counts["errors"] += len(batch)
+                print(f"❌ 同期エラー ({len(batch)} 件): {e}")
+
+    def _stored(self, museum_id):
+        if museum_id not in self._index:
+            self._index[museum_id] = load_event_index(museum_id, self.client)
+        return self._index[museum_id]
+
+    def _write(self, batch):
+        # 内容が変わっていない行は送らない
+        items = []
+        for key, event in batch.items():
+            digest = content_hash(event)
+            if self._seen.get(key) == digest:
+                continue
+            self._seen[key] = digest
+            stored = self._stored(key[0]).get(key)
+            # restore_withdrawn のときは、取り下げ済みの行を内容が同じでも送って withdrawn_at を null に戻す
+            if stored and stored["hash"] == digest and not (self.restore_withdrawn and stored["withdrawn"]):
+                self.counts["unchanged"] += 1
+            else:
+                items.append((key, event, digest))
+
+        for chunk in _chunks(items, self.chunk_size):
+            rows = [event for _, event, _ in chunk]
+            if self.restore_withdrawn:
+                rows = [dict(event, withdrawn_at=None) for event in rows]
+            try:
+                with metrics.timer("db_upsert"):
+                    self.client.table(EVENTS_TABLE)\
+                        .upsert(rows, on_conflict=CONFLICT_COLUMNS)\
+                        .execute()
+            except Exception as e:
+                self.counts["errors"] += len(chunk)
+                print(f"❌ upsert エラー ({len(chunk)} 件): {e}")
+                continue
+
+            for key, event, digest in chunk:
+                index = self._index[key[0]]
+                if key in index:
+                    self.counts["updated"] += 1
+                    print(f"🔄 更新完了: {event['title']}")
+                else:
+                    self.counts["inserted"] += 1
+                    print(f"🆕 新規登録: {event['title']}")
+                index[key] = {
+                    "id": index.get(key, {}).get("id"),
+                    "hash": digest,
+                    "last": normalize_date(event.get("end_date") or event["start_date"]),
+                    "withdrawn": index.get(key, {}).get("withdrawn", False) and not self.restore_withdrawn,
+                }
+
+
+def sync_events(events, client=None, chunk_size=DEFAULT_CHUNK_SIZE, reconcile=False):
+    """events（リストでもジェネレーターでもよい）を流し込みながら upsert し、
+    {"received", "inserted", "updated", "unchanged", "withdrawn", "errors"} の件数を返す
+
+    reconcile=True なら、events に含まれなかった今後のイベントを取り下げ、
+    再び掲載されたイベントの取り下げを戻す（ライブの取得で events が館の全件のときだけ）。
+    """
+    with EventSink(client, chunk_size, reconcile=reconcile, restore_withdrawn=reconcile) as sink:
+        sink.extend(events)
+    return sink.counts
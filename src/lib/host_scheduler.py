@@ -0,0 +1,156 @@
+# src/lib/host_scheduler.py
+#
+# 取得の順番待ちをまとめて管理するスケジューラー（HTTP もブラウザもここを通す）
+#  - ホストごとのトークンバケット: 平均 rate 回/秒、連続 burst 回まで
+#  - ホストごとの同時接続数（HTTP とブラウザの合計）
+#  - 全体の同時実行数: HTTP（SCRAPER_HTTP_CONCURRENCY）とブラウザ（BROWSER_MAX_PAGES）で別枠
+#  - 429 / 503 の Retry-After を受けたら、そのホストへの取得を全スレッドでその時刻まで止める
+# スクレイパーを並列に走らせても、1 サイトあたりの負荷は上がらないようにするためのもの
+# 小さな自治体サイトなどは HOST_LIMITS で個別に絞る（SCRAPER_HOST_RATES="host=rate,..." で上書き可）
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+from src.lib import metrics
+
+DEFAULT_RATE = float(os.environ.get("SCRAPER_HOST_RATE", "2.0"))
+DEFAULT_BURST = int(os.environ.get("SCRAPER_HOST_BURST", "4"))
+DEFAULT_HOST_CONCURRENCY = int(os.environ.get("HTTP_PER_HOST_CONCURRENCY", "2"))
+HTTP_CONCURRENCY = int(os.environ.get("SCRAPER_HTTP_CONCURRENCY", "8"))
+BROWSER_CONCURRENCY = int(os.environ.get("BROWSER_MAX_PAGES", "4"))
+# Retry-After が極端に長くても、この秒数より長くは止めない
+MAX_RETRY_AFTER = 120.0
+
+# ホストごとの上書き: {ホスト: {"rate": 回/秒, "burst": 回, "concurrency": 本}}
+HOST_LIMITS = {
+    "www.city.tainai.niigata.jp": {"rate": 0.5, "burst": 2, "concurrency": 1},
+    "kansatukan.jp": {"rate": 0.5, "burst": 2, "concurrency": 1},
+}
+
+
+def _env_rates():
+    limits = {}
+    for item in os.environ.get("SCRAPER_HOST_RATES", "").split(","):
+        host, _, rate = item.strip().partition("=")
+        if host and rate:
+            limits[host] = {"rate": float(rate)}
+    return limits
+
+
+def retry_after_seconds(value):
+    """Retry-After ヘッダー（秒数 or HTTP 日付）を秒数にする。読めなければ None"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if at.tzinfo is None:
+        at = at.replace(tzinfo=timezone.utc)
+    return max(0.0, (at - datetime.now(timezone.utc)).total_seconds())
+
+
+class _Host:
+    def __init__(self, rate, burst, concurrency, now):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = now
+        self.not_before = 0.0
+        self.slots = threading.BoundedSemaphore(concurrency)
+
+    def take(self, now):
+        """トークンを 1 つ取れたら 0、取れなければ次に試すまでの秒数を返す"""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if now < self.not_before:
+            return self.not_before - now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class HostScheduler:
+    def __init__(self, rate=DEFAULT_RATE, burst=DEFAULT_BURST, host_concurrency=DEFAULT_HOST_CONCURRENCY,
+                 http_concurrency=HTTP_CONCURRENCY, browser_concurrency=BROWSER_CONCURRENCY, host_limits=None,
+                 clock=time.monotonic, sleep=time.sleep):
+        # clock / sleep はテストで差し替える（実時間を待たずにトークンの補充を確かめる）
+        self._clock = clock
+        self._sleep = sleep
+        self.defaults = {"rate": rate, "burst": burst, "concurrency": host_concurrency}
+        self.host_limits = dict(HOST_LIMITS if host_limits is None else host_limits)
+        for host, limits in _env_rates().items():
+            self.host_limits[host] = {**self.host_limits.get(host, {}), **limits}
+        self._kinds = {
+            "http": threading.BoundedSemaphore(http_concurrency),
+            "browser": threading.BoundedSemaphore(browser_concurrency),
+        }
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def _host(self, host):
+        with self._lock:
+            state = self._hosts.get(host)
+            if state is None:
+                limits = {**self.defaults, **self.host_limits.get(host, {})}
+                state = self._hosts[host] = _Host(limits["rate"], limits["burst"], limits["concurrency"], self._clock())
+            return state
+
+    def _wait_token(self, state):
+        while True:
+            with self._lock:
+                delay = state.take(self._clock())
+            if delay <= 0:
+                return
+            self._sleep(delay)
+
+    @contextmanager
+    def slot(self, url, kind="http"):
+        """url への取得 1 回分の枠。with の中で取得する"""
+        host = urlsplit(url).netloc
+        state = self._host(host)
+        # ホストの枠 → トークン → 全体の枠の順に取る（全体の枠を持ったまま 1 ホストの順番を待たない）
+        with metrics.timer("slot_wait", kind=kind, host=host):
+            state.slots.acquire()
+            try:
+                self._wait_token(state)
+                self._kinds[kind].acquire()
+            except BaseException:
+                state.slots.release()
+                raise
+        try:
+            yield
+        finally:
+            self._kinds[kind].release()
+            state.slots.release()
+
+    def defer(self, url, seconds):
+        """Retry-After などで、url のホストへの取得を seconds 秒後まで止める"""
+        seconds = min(MAX_RETRY_AFTER, max(0.0, seconds))
+        host = urlsplit(url).netloc
+        state = self._host(host)
+        with self._lock:
+            state.not_before = max(state.not_before, self._clock() + seconds)
+        metrics.inc("host_deferred", host=host)
+        print(f"⏸️ {host} への取得を {seconds:.1f}s 止める（Retry-After）")
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = HostScheduler()
+        return _scheduler
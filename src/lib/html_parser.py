@@ -0,0 +1,42 @@
+# src/lib/html_parser.py
+#
+# スクレイパー共通の HTML パース
+#  - only= に strainer() を渡すと、条件に合う要素（とその子孫）だけで木を作る
+#  - パーサーは lxml があれば lxml、なければ html.parser（SCRAPER_HTML_PARSER で上書き可）
+# どちらのパーサーでも返り値は BeautifulSoup なので、呼び出し側のコードは変わらない
+
+import importlib.util
+import os
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+from src.lib import metrics
+
+
+def _default_backend():
+    backend = os.environ.get("SCRAPER_HTML_PARSER")
+    if backend:
+        return backend
+    return "lxml" if importlib.util.find_spec("lxml") is not None else "html.parser"
+
+
+BACKEND = _default_backend()
+
+
+def _has_class(class_name):
+    # パース中の class 属性は "a b" のような文字列のままなので、トークン単位で比べる
+    def match(value):
+        return bool(value) and class_name in value.split()
+    return match
+
+
+def strainer(name=None, class_=None, **attrs):
+    """parse_html(only=...) 用の条件。class_ は複数クラスのうち 1 つに一致すればよい"""
+    if class_ is not None:
+        attrs["class"] = _has_class(class_)
+    return SoupStrainer(name, attrs)
+
+
+def parse_html(html, only=None, backend=None):
+    with metrics.timer("parse"):
+        return BeautifulSoup(html, backend or BACKEND, parse_only=only)
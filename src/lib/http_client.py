@@ -0,0 +1,145 @@
+# src/lib/http_client.py
+#
+# 全スクレイパー共通の HTTP クライアント
+# httpx.Client を 1 つだけ作ってコネクションを使い回し（h2 があれば HTTP/2）、
+# タイムアウト・指数バックオフ付きリトライをまとめて面倒を見る
+# 取得の順番待ち（ホストごとの頻度・同時接続数、Retry-After）は host_scheduler に任せる
+# 取得した本文は page_archive に記録し、replay モードではアーカイブから返す
+# httpx は最初の取得時に import する（パースだけ使う import を軽く保つため）
+
+import importlib.util
+import os
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+from src.lib import metrics, page_archive
+from src.lib.host_scheduler import get_scheduler, retry_after_seconds
+
+DEFAULT_TIMEOUT = 20.0
+CONNECT_TIMEOUT = 10.0
+DEFAULT_HEADERS = {"User-Agent": "Mozilla/5.0"}
+MAX_RETRIES = int(os.environ.get("HTTP_MAX_RETRIES", "3"))
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 8.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def _detect_encoding(content):
+    # Content-Type に charset がないページ（Shift_JIS の自治体サイトなど）向けの推定
+    from charset_normalizer import from_bytes
+
+    best = from_bytes(content).best()
+    return best.encoding if best else "utf-8"
+
+
+def get_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            import httpx
+
+            _client = httpx.Client(
+                http2=importlib.util.find_spec("h2") is not None,
+                timeout=httpx.Timeout(DEFAULT_TIMEOUT, connect=CONNECT_TIMEOUT),
+                headers=DEFAULT_HEADERS,
+                follow_redirects=True,
+                default_encoding=_detect_encoding,
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+            )
+        return _client
+
+
+def close_client():
+    global _client
+    with _client_lock:
+        client, _client = _client, None
+    if client is not None:
+        client.close()
+
+
+def _backoff_delay(attempt):
+    return min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)) * random.uniform(0.5, 1.5)
+
+
+def _replay_response(url):
+    import httpx
+
+    entry, body = page_archive.replay(url, "http")
+    metrics.inc("pages_fetched", kind="replay", host=urlsplit(url).netloc)
+    res = httpx.Response(
+        entry["status"],
+        headers=entry["headers"],
+        content=body,
+        request=httpx.Request("GET", entry["final_url"]),
+    )
+    if entry.get("encoding"):
+        res.encoding = entry["encoding"]
+    return res
+
+
+def _archive(url, res):
+    if page_archive.recording() and res.is_success:
+        page_archive.record(
+            url,
+            res.content,
+            "http",
+            status=res.status_code,
+            headers=dict(res.headers),
+            encoding=res.encoding,
+            final_url=str(res.url),
+        )
+
+
+def fetch(url, headers=None, timeout=None, retries=MAX_RETRIES):
+    """GET してレスポンスを返す（ステータスの検査は呼び出し側で行う）
+
+    接続エラーと 429 / 5xx はジッター付き指数バックオフで retries 回まで再試行する。
+    Retry-After が付いていれば、そのホストへの取得は他のスレッドも含めてその時刻まで待たせる。
+    replay モードではネットワークに出ず、アーカイブにある最新の本文を返す。
+    """
+    if page_archive.replaying():
+        return _replay_response(url)
+    import httpx
+
+    host = urlsplit(url).netloc
+    scheduler = get_scheduler()
+    options = {"timeout": timeout} if timeout else {}
+    for attempt in range(retries + 1):
+        try:
+            with scheduler.slot(url, "http"), metrics.timer("http", host=host):
+                res = get_client().get(url, headers=headers, **options)
+        except httpx.TransportError as e:
+            metrics.inc("http_errors", host=host, reason=e.__class__.__name__)
+            if attempt >= retries:
+                raise
+            delay = _backoff_delay(attempt)
+            print(f"🔁 {url} 再試行 {attempt + 1}/{retries} ({e.__class__.__name__}, {delay:.1f}s 後)")
+            time.sleep(delay)
+            continue
+
+        if res.status_code >= 400:
+            metrics.inc("http_errors", host=host, reason=res.status_code)
+            retry_after = retry_after_seconds(res.headers.get("Retry-After"))
+            if retry_after is not None:
+                scheduler.defer(url, retry_after)
+        if res.status_code in RETRY_STATUSES and attempt < retries:
+            delay = _backoff_delay(attempt)
+            print(f"🔁 {url} 再試行 {attempt + 1}/{retries} (HTTP {res.status_code}, {delay:.1f}s 後)")
+            time.sleep(delay)
+            continue
+        if res.is_success:
+            metrics.inc("pages_fetched", kind="http", host=host)
+            metrics.inc("fetched_bytes", len(res.content), kind="http", host=host)
+        _archive(url, res)
+        return res
+
+
+def fetch_text(url, headers=None, timeout=None):
+    res = fetch(url, headers=headers, timeout=timeout)
+    res.raise_for_status()
+    return res.text
@@ -0,0 +1,99 @@
+# src/lib/keyword_filter.py
+#
+# タイトルの除外／対象キーワード判定
+# exclude_keywords.json は 1 プロセスにつき 1 回だけ読み込み、
+# キーワードを Aho-Corasick オートマトンにまとめてタイトルを 1 回走査するだけで判定する。
+# キーワードとタイトルはどちらも NFKC 正規化してから比べる。
+
+import json
+import os
+import unicodedata
+from collections import deque
+from functools import lru_cache
+
+from src.lib import metrics
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+EXCLUDE_KEYWORDS_PATH = os.path.join(BASE_DIR, "exclude_keywords.json")
+
+
+def _normalize(text):
+    return unicodedata.normalize("NFKC", text or "")
+
+
+class KeywordMatcher:
+    def __init__(self, keywords):
+        self.keywords = [k for k in dict.fromkeys(_normalize(k) for k in keywords) if k]
+        # 状態ごとの遷移・失敗リンク・その状態で一致が確定するキーワード
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [None]
+
+        for keyword in self.keywords:
+            state = 0
+            for ch in keyword:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append(None)
+                state = nxt
+            if self._output[state] is None:
+                self._output[state] = keyword
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[nxt] = self._goto[fallback].get(ch, 0)
+                if self._output[nxt] is None:
+                    self._output[nxt] = self._output[self._fail[nxt]]
+
+    def search(self, text):
+        """text に含まれるキーワードのうち、最も手前で一致したものを返す（なければ None）"""
+        state = 0
+        for ch in _normalize(text):
+            while state and ch not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(ch, 0)
+            if self._output[state] is not None:
+                return self._output[state]
+        return None
+
+
+class EventFilter:
+    def __init__(self, exclude=(), include=None):
+        self.exclude = KeywordMatcher(exclude)
+        # include を指定した館は、いずれかを含むタイトルだけを対象にする
+        self.include = KeywordMatcher(include) if include else None
+
+    def excluded_by(self, title):
+        """除外キーワードに一致すればそのキーワードを返す"""
+        keyword = self.exclude.search(title)
+        if keyword is not None:
+            metrics.inc("events_excluded", keyword=keyword)
+        return keyword
+
+    def included(self, title):
+        if self.include is None or self.include.search(title) is not None:
+            return True
+        metrics.inc("events_excluded", keyword="(対象外)")
+        return False
+
+
+@lru_cache(maxsize=None)
+def load_exclude_keywords():
+    with open(EXCLUDE_KEYWORDS_PATH, "r", encoding="utf-8") as f:
+        return tuple(json.load(f))
+
+
+@lru_cache(maxsize=None)
+def load_event_filter(exclude=(), include=None):
+    """共通の除外キーワードに館ごとの exclude / include（タプル）を足したフィルタを返す"""
+    return EventFilter(load_exclude_keywords() + tuple(exclude), include)
@@ -0,0 +1,199 @@
+# src/lib/metrics.py
+#
+# スクレイパー実行の計測（フェーズごとの所要時間とカウンター）
+#  - inc("pages_fetched", kind="http", host=...) のようにカウンターを足す
+#  - with timer("navigation", host=...): でフェーズの所要時間（回数・合計・最大）を記録する
+#  - run_all が scope(スクリプト名) の中で各スクレイパーを動かすので、
+#    そのスレッドで記録した値には自動で scraper ラベルが付く
+#  - 実行の最後に write_reports() で JSONL（実行履歴に追記）と Prometheus の textfile を書き出す
+# 書き出し先は SCRAPER_METRICS_DIR（既定は .cache/metrics/）
+
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+CACHE_DIR = os.environ.get("SCRAPER_CACHE_DIR", os.path.join(BASE_DIR, ".cache"))
+METRICS_DIR = os.environ.get("SCRAPER_METRICS_DIR", os.path.join(CACHE_DIR, "metrics"))
+JSONL_NAME = "metrics.jsonl"
+PROM_NAME = "scraper.prom"
+PREFIX = "scraper_"
+
+HELP = {
+    "pages_fetched": "取得したページ数（kind=http/browser/replay）",
+    "fetched_bytes": "取得したページの本文のバイト数",
+    "http_errors": "HTTP の失敗回数（再試行を含む。reason はステータスか例外名）",
+    "browser_errors": "ブラウザでの取得失敗回数",
+    "blocked_requests": "ブラウザで中断したリクエスト数（type は resource_type）",
+    "tier_fetches": "段階的取得でどちらの段階で取得したか（tier=http/browser）",
+    "tier_escalations": "HTTP で足りずブラウザに切り替えた回数",
+    "host_deferred": "Retry-After でホストへの取得を止めた回数",
+    "not_modified": "条件付き GET で変更なしと判定されたページ数",
+    "section_cache": "見出しブロック単位のパース結果キャッシュ（result=hit/miss）",
+    "events": "取得したイベント数",
+    "events_excluded": "除外キーワードで除いたイベント数",
+    "events_skipped": "日付が読めない等で除いたイベント数",
+    "db_rows": "同期した行数（result=inserted/updated/unchanged/withdrawn/errors）",
+    "withdraw_refused": "消えた件数が多すぎるため取り下げを見送った館の数",
+    "phase_seconds": "フェーズごとの所要時間（秒）",
+    "run_seconds": "スクレイパー 1 本の所要時間（秒）",
+    "recrawl_interval_days": "変化の頻度から決めた次回取得までの日数",
+    "up": "直近の実行が成功したか（1=成功 / 0=失敗）",
+    "last_run_timestamp_seconds": "直近の実行の終了時刻（UNIX 秒）",
+}
+
+_lock = threading.Lock()
+_counters = {}
+_timers = {}
+_gauges = {}
+_scraper = contextvars.ContextVar("scraper", default=None)
+
+
+def _key(name, labels):
+    if "scraper" not in labels and _scraper.get():
+        labels["scraper"] = _scraper.get()
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items() if v is not None))
+
+
+def inc(name, value=1, **labels):
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def set_gauge(name, value, **labels):
+    key = _key(name, labels)
+    with _lock:
+        _gauges[key] = value
+
+
+def observe(name, seconds, **labels):
+    key = _key(name, labels)
+    with _lock:
+        count, total, peak = _timers.get(key, (0, 0.0, 0.0))
+        _timers[key] = (count + 1, total + seconds, max(peak, seconds))
+
+
+@contextmanager
+def timer(phase, **labels):
+    """with の中の所要時間を phase_seconds{phase=...} に記録する（例外で抜けても記録する）"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe("phase_seconds", time.perf_counter() - started, phase=phase, **labels)
+
+
+@contextmanager
+def scope(scraper):
+    """このスレッド（とそこから bind したもの）で記録する値に scraper ラベルを付ける"""
+    token = _scraper.set(scraper)
+    try:
+        yield
+    finally:
+        _scraper.reset(token)
+
+
+def current_scraper():
+    return _scraper.get()
+
+
+def bind(func):
+    """ThreadPoolExecutor に渡す関数に、呼び出し元の scraper ラベルを引き継がせる"""
+    context = contextvars.copy_context()
+
+    def run(*args, **kwargs):
+        # 同じ Context は複数スレッドで同時に使えないので、呼び出しごとに複製する
+        return context.copy().run(func, *args, **kwargs)
+    return run
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _timers.clear()
+        _gauges.clear()
+
+
+def snapshot():
+    """記録した値を [{"name", "type", "labels", ...}] で返す"""
+    with _lock:
+        counters = dict(_counters)
+        gauges = dict(_gauges)
+        timers = dict(_timers)
+    rows = []
+    for (name, labels), value in sorted(counters.items()):
+        rows.append({"name": name, "type": "counter", "labels": dict(labels), "value": value})
+    for (name, labels), value in sorted(gauges.items()):
+        rows.append({"name": name, "type": "gauge", "labels": dict(labels), "value": value})
+    for (name, labels), (count, total, peak) in sorted(timers.items()):
+        rows.append({
+            "name": name, "type": "summary", "labels": dict(labels),
+            "count": count, "sum": round(total, 6), "max": round(peak, 6),
+        })
+    return rows
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _series(name, labels, value):
+    body = ",".join(f'{k}="{_escape(v)}"' for k, v in sorted(labels.items()))
+    return f"{PREFIX}{name}{{{body}}} {value}" if body else f"{PREFIX}{name} {value}"
+
+
+def render_prometheus(rows=None):
+    """Prometheus の textfile 形式。1 回の実行の値なので、カウンターもゲージとして出す"""
+    rows = snapshot() if rows is None else rows
+    lines = []
+    declared = set()
+    for row in rows:
+        name = row["name"]
+        if name not in declared:
+            declared.add(name)
+            kind = "summary" if row["type"] == "summary" else "gauge"
+            if name in HELP:
+                lines.append(f"# HELP {PREFIX}{name} {HELP[name]}")
+            lines.append(f"# TYPE {PREFIX}{name} {kind}")
+        if row["type"] == "summary":
+            lines.append(_series(name + "_count", row["labels"], row["count"]))
+            lines.append(_series(name + "_sum", row["labels"], row["sum"]))
+        else:
+            lines.append(_series(name, row["labels"], row["value"]))
+    # 最大値は summary とは別のゲージにする（同じ名前の下に置けないため）
+    for row in rows:
+        if row["type"] == "summary":
+            name = row["name"] + "_max"
+            if name not in declared:
+                declared.add(name)
+                lines.append(f"# TYPE {PREFIX}{name} gauge")
+            lines.append(_series(name, row["labels"], row["max"]))
+    return "\n".join(lines) + "\n"
+
+
+def write_reports(directory=None, run_id=None):
+    """JSONL（1 行 1 系列、実行ごとに追記）と Prometheus textfile（毎回置き換え）を書き出す"""
+    directory = directory or METRICS_DIR
+    os.makedirs(directory, exist_ok=True)
+    finished = datetime.now(timezone.utc)
+    run_id = run_id or finished.strftime("%Y%m%dT%H%M%SZ")
+    set_gauge("last_run_timestamp_seconds", int(finished.timestamp()))
+    rows = snapshot()
+
+    jsonl_path = os.path.join(directory, JSONL_NAME)
+    with open(jsonl_path, "a", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps({"run_id": run_id, "at": finished.isoformat(), **row}, ensure_ascii=False) + "\n")
+
+    # node_exporter が書きかけを読まないよう、一時ファイルから置き換える
+    prom_path = os.path.join(directory, PROM_NAME)
+    tmp = prom_path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(render_prometheus(rows))
+    os.replace(tmp, prom_path)
+    return jsonl_path, prom_path
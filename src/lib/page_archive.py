@@ -0,0 +1,164 @@
+# src/lib/page_archive.py
+#
+# 取得したページの生データを .cache/archive/ に保存し、あとから再生できるようにする
+#  - objects/ab/<sha256>.gz: 本文を gzip で圧縮し、内容のハッシュで 1 回だけ保存（同じ本文は共有）
+#  - index/YYYY-MM-DD.jsonl: 取得 1 回につき 1 行（URL・取得時刻・種別・ステータス・ヘッダー・ハッシュ）
+# SCRAPER_FETCH_MODE で動作を切り替える
+#  - record（既定）: 通常どおり取得し、取得したページをアーカイブに追記する
+#  - replay: ネットワークにも Chromium にも触れず、アーカイブの最新版を返す
+#            SCRAPER_REPLAY_DATE=YYYY-MM-DD でその日（日本時間）までの記録に限定できる
+#  - live: 取得のみでアーカイブしない
+
+import glob
+import gzip
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, timezone
+
+from src.lib.date_parser import JST
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+CACHE_DIR = os.environ.get("SCRAPER_CACHE_DIR", os.path.join(BASE_DIR, ".cache"))
+ARCHIVE_DIR = os.path.join(CACHE_DIR, "archive")
+OBJECTS_DIR = os.path.join(ARCHIVE_DIR, "objects")
+INDEX_DIR = os.path.join(ARCHIVE_DIR, "index")
+MODES = ("record", "replay", "live")
+# 再生に不要で、保存したくないヘッダー
+DROP_HEADERS = {"set-cookie", "content-encoding", "content-length", "transfer-encoding"}
+
+_mode = os.environ.get("SCRAPER_FETCH_MODE", "record")
+_replay_date = os.environ.get("SCRAPER_REPLAY_DATE")
+_lock = threading.Lock()
+_latest = None
+
+
+class ArchiveMiss(LookupError):
+    """replay モードで url の記録がアーカイブにない"""
+
+    def __init__(self, url, kind):
+        super().__init__(f"{kind}: {url}")
+        self.url = url
+        self.kind = kind
+
+
+def mode():
+    return _mode
+
+
+def set_mode(value, replay_date=None):
+    global _mode, _replay_date, _latest
+    if value not in MODES:
+        raise ValueError(f"SCRAPER_FETCH_MODE は {', '.join(MODES)} のいずれか: {value}")
+    with _lock:
+        _mode = value
+        _replay_date = replay_date or _replay_date
+        _latest = None
+
+
+def replay_date():
+    """replay で使う記録の日付（YYYY-MM-DD）。指定がなければ None（最新版を使う）"""
+    return _replay_date
+
+
+def recording():
+    return _mode == "record"
+
+
+def replaying():
+    return _mode == "replay"
+
+
+def _object_path(digest):
+    return os.path.join(OBJECTS_DIR, digest[:2], digest + ".gz")
+
+
+def record(url, body, kind, status=200, headers=None, encoding=None, final_url=None):
+    """取得したページをアーカイブに追加し、本文のハッシュを返す（record モード以外は何もしない）"""
+    if not recording():
+        return None
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+        encoding = "utf-8"
+    digest = hashlib.sha256(body).hexdigest()
+
+    path = _object_path(digest)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(gzip.compress(body, mtime=0))
+        os.replace(tmp, path)
+
+    now = datetime.now(timezone.utc)
+    entry = {
+        "url": url,
+        "final_url": final_url or url,
+        "kind": kind,
+        "fetched_at": now.isoformat(),
+        "status": status,
+        "headers": {k: v for k, v in (headers or {}).items() if k.lower() not in DROP_HEADERS},
+        "encoding": encoding,
+        "sha256": digest,
+        "size": len(body),
+    }
+    line = json.dumps(entry, ensure_ascii=False) + "\n"
+    with _lock:
+        os.makedirs(INDEX_DIR, exist_ok=True)
+        with open(os.path.join(INDEX_DIR, now.astimezone(JST).date().isoformat() + ".jsonl"), "a", encoding="utf-8") as f:
+            f.write(line)
+        if _latest is not None:
+            _latest[(kind, url)] = entry
+    return digest
+
+
+def iter_entries(since=None, until=None):
+    """インデックスの記録を古い順に返す。since / until は YYYY-MM-DD（日本時間、両端を含む）"""
+    for path in sorted(glob.glob(os.path.join(INDEX_DIR, "*.jsonl"))):
+        day = os.path.basename(path)[:-len(".jsonl")]
+        if (since and day < since) or (until and day > until):
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+
+def _latest_entries():
+    global _latest
+    with _lock:
+        if _latest is None:
+            latest = {}
+            for entry in iter_entries(until=_replay_date):
+                latest[(entry["kind"], entry["url"])] = entry
+            _latest = latest
+        return _latest
+
+
+def lookup(url, kind):
+    """url の最新の記録（replay 日付の指定があればその日まで）を返す。なければ None"""
+    return _latest_entries().get((kind, url))
+
+
+def read_body(entry):
+    with open(_object_path(entry["sha256"]), "rb") as f:
+        return gzip.decompress(f.read())
+
+
+def read_text(entry):
+    return read_body(entry).decode(entry.get("encoding") or "utf-8", errors="replace")
+
+
+def fetched_on(entry):
+    """記録を取得した日（日本時間）"""
+    return datetime.fromisoformat(entry["fetched_at"]).astimezone(JST).date()
+
+
+def replay(url, kind):
+    """(記録, 本文 bytes) を返す。記録がなければ ArchiveMiss"""
+    entry = lookup(url, kind)
+    if entry is None:
+        raise ArchiveMiss(url, kind)
+    return entry, read_body(entry)
@@ -0,0 +1,154 @@
+# src/lib/recrawl_schedule.py
+#
+# 館ごとの取得間隔を、実際にイベントが変わった頻度から決める
+#  - 実行ごとにイベント集合のハッシュ・今後のイベントの開始日を .cache/recrawl/<館>.json に残す
+#  - よく変わる館は毎日、めったに変わらない館は最大 MAX_INTERVAL_DAYS 日おきに取得する
+#  - 季節の変わり目（SEASON_STARTS から SEASON_WINDOW_DAYS 日間）と、
+#    既知のイベントの開始 LEAD_DAYS 日前からは毎日取得する（告知の追加・変更を取りこぼさない）
+# run_all --due-only が、次回予定日を過ぎた館だけを実行する
+# cron は 1 日 1 回なので、間隔は日単位（日本時間の日付）で扱う
+
+import hashlib
+import json
+import os
+import threading
+from datetime import date, datetime, timedelta
+
+from src.lib.date_parser import JST
+from src.lib.event_sync import content_hash, normalize_date
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+CACHE_DIR = os.environ.get("SCRAPER_CACHE_DIR", os.path.join(BASE_DIR, ".cache"))
+RECRAWL_DIR = os.path.join(CACHE_DIR, "recrawl")
+
+MIN_INTERVAL_DAYS = 1
+MAX_INTERVAL_DAYS = int(os.environ.get("RECRAWL_MAX_INTERVAL_DAYS", "7"))
+# これより記録が少ない館は毎日取得して、変わる頻度を測る
+MIN_OBSERVATIONS = 4
+HISTORY_SIZE = 60
+# 春休み・GW・夏休み・秋の行事の告知が出始める時期（月, 日）
+SEASON_STARTS = ((3, 1), (4, 1), (7, 1), (9, 15))
+SEASON_WINDOW_DAYS = 21
+LEAD_DAYS = 3
+UPCOMING_SIZE = 50
+
+_lock = threading.Lock()
+
+
+def today():
+    return datetime.now(JST).date()
+
+
+def _path(name):
+    return os.path.join(RECRAWL_DIR, name + ".json")
+
+
+def load_history(name):
+    try:
+        with open(_path(name), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"name": name, "runs": [], "upcoming": []}
+
+
+def _save_history(history):
+    path = _path(history["name"])
+    with _lock:
+        os.makedirs(RECRAWL_DIR, exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(history, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, path)
+
+
+class Observation:
+    """1 回の実行で流れたイベントから、イベント集合のハッシュと今後の開始日を集める"""
+
+    def __init__(self, day=None):
+        self.day = day or today()
+        self._hashes = []
+        self.upcoming = set()
+
+    def watch(self, events):
+        """events をそのまま流しながら記録する（ジェネレーターのまま同期に渡せる）"""
+        first = self.day.isoformat()
+        for event in events:
+            self._hashes.append(content_hash(event))
+            start = normalize_date(event.get("start_date"))
+            if start >= first:
+                self.upcoming.add(start)
+            yield event
+
+    @property
+    def digest(self):
+        # 取得順に左右されないよう、並べ替えてからまとめる
+        return hashlib.sha256("\n".join(sorted(self._hashes)).encode("utf-8")).hexdigest()
+
+
+def _in_season(day):
+    for month, start_day in SEASON_STARTS:
+        start = date(day.year, month, start_day)
+        if start <= day < start + timedelta(days=SEASON_WINDOW_DAYS):
+            return True
+    return False
+
+
+def interval_days(history, day=None):
+    """次の取得までの日数"""
+    day = day or today()
+    runs = history["runs"]
+    if len(runs) < MIN_OBSERVATIONS:
+        interval = MIN_INTERVAL_DAYS
+    else:
+        span = (date.fromisoformat(runs[-1]["date"]) - date.fromisoformat(runs[0]["date"])).days
+        changes = sum(1 for run in runs[1:] if run["changed"])
+        if not changes:
+            interval = MAX_INTERVAL_DAYS
+        else:
+            # 平均の変化間隔の半分ごとに見れば、新しいイベントは遅くとも半周期で拾える
+            interval = span // changes // 2
+    interval = max(MIN_INTERVAL_DAYS, min(MAX_INTERVAL_DAYS, interval))
+
+    if _in_season(day):
+        interval = MIN_INTERVAL_DAYS
+    upcoming = sorted(s for s in history.get("upcoming", []) if s >= day.isoformat())
+    if upcoming:
+        # いちばん近いイベントの開始 LEAD_DAYS 日前には取得が回ってくるようにする
+        lead_start = date.fromisoformat(upcoming[0]) - timedelta(days=LEAD_DAYS)
+        interval = min(interval, max(MIN_INTERVAL_DAYS, (lead_start - day).days))
+    return interval
+
+
+def record(name, digest=None, upcoming=None, day=None):
+    """実行結果を記録し、次回の予定日を返す。digest=None はページに変更がなかった（NotModified）"""
+    day = day or today()
+    history = load_history(name)
+    runs = history["runs"]
+    if digest is None:
+        digest = runs[-1]["digest"] if runs else None
+    # 同じ日に何度も実行したときは最後の結果だけ残す（手動実行で間隔の推定がずれないように）
+    if runs and runs[-1]["date"] == day.isoformat():
+        runs.pop()
+    # 前回の内容が分からない（初回や NotModified だけの履歴）ときは変化として数えない
+    changed = bool(runs) and runs[-1]["digest"] is not None and digest != runs[-1]["digest"]
+    runs.append({"date": day.isoformat(), "digest": digest, "changed": changed})
+    history["runs"] = runs[-HISTORY_SIZE:]
+    if upcoming is not None:
+        history["upcoming"] = sorted(upcoming)[:UPCOMING_SIZE]
+    history["upcoming"] = [s for s in history.get("upcoming", []) if s >= day.isoformat()]
+
+    interval = interval_days(history, day)
+    history["interval_days"] = interval
+    history["next"] = (day + timedelta(days=interval)).isoformat()
+    _save_history(history)
+    return history["next"], interval
+
+
+def next_due(name):
+    """次回の予定日（記録がなければ None = すぐ取得する）"""
+    return load_history(name).get("next")
+
+
+def is_due(name, day=None):
+    due = next_due(name)
+    return due is None or due <= (day or today()).isoformat()
@@ -0,0 +1,149 @@
+# src/lib/section_cache.py
+#
+# 見出しごとのブロック（h2 / h3 / h4 から、文書順で次の同じ見出しの手前まで）単位のパース結果キャッシュ
+# 見出しが自分の div などに包まれていても、ブロックは文書順（next_elements）でたどるので同じように扱える
+# 1 ページに全イベントが並ぶ館では、実行のたびに変わるのはたいてい 1 ブロックだけなので、
+# ブロックの中身（タグ・属性・文字列、空白は詰める）のハッシュが同じなら日付の解釈・説明文の抽出を省いて前回の結果を使う
+#  - キーはブロックのハッシュ・館ごとのパーサー版数（version）・年の推測の期間（date_parser.year_epoch）
+#    パース処理を直したら、そのスクレイパーの version を上げる
+#  - .cache/sections/<名前>.json に保存し、今回のページに現れたブロックの分だけ残す
+#  - 除外キーワードの判定はキャッシュせず、毎回スクレイパー側で行う
+#  - parse_section はブロックの外を読まないこと（find_next ではなく section_find を使う）
+#    ハッシュに入らない次のブロックを読むと、キャッシュの結果がパースし直した結果と食い違う
+# SCRAPER_SECTION_CACHE=0 で無効。replay（再処理の検証）では常に作り直す
+
+import hashlib
+import json
+import os
+import re
+
+from bs4 import NavigableString, Tag
+
+from src.lib import metrics, page_archive
+from src.lib.date_parser import year_epoch
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+CACHE_DIR = os.environ.get("SCRAPER_CACHE_DIR", os.path.join(BASE_DIR, ".cache"))
+SECTIONS_DIR = os.path.join(CACHE_DIR, "sections")
+ENABLED = os.environ.get("SCRAPER_SECTION_CACHE", "1") != "0"
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def section_siblings(heading):
+    """heading のブロックを覆う要素（説明文の抽出用）
+
+    heading の後ろの兄弟を、次の同じ見出し（かそれを含む要素）の手前まで返す。
+    heading の後ろに兄弟要素がなければ（見出しだけを包んだ div など）、包んでいる要素の後ろの兄弟を使う。
+    """
+    node = heading
+    while not any(isinstance(sib, Tag) for sib in node.next_siblings):
+        if node.parent is None or node.parent.parent is None:
+            return []
+        node = node.parent
+    siblings = []
+    for sib in node.next_siblings:
+        if isinstance(sib, Tag) and (sib.name == heading.name or sib.find(heading.name)):
+            break
+        siblings.append(sib)
+    return siblings
+
+
+def section_elements(heading):
+    """heading のブロック内の要素・文字列を文書順に（見出し自身から、次の同じ見出しの手前まで）"""
+    yield heading
+    for el in heading.next_elements:
+        if isinstance(el, Tag) and el.name == heading.name:
+            return
+        yield el
+
+
+def section_find(heading, name=None, class_=None, string=None):
+    """find_next と同じ順で探すが、heading のブロックの外には出ない
+
+    name（と class_）でタグを、string（正規表現）で文字列を探す。
+    """
+    for el in section_elements(heading):
+        if string is not None:
+            if isinstance(el, NavigableString) and string.search(el):
+                return el
+        elif isinstance(el, Tag) and el.name == name and (class_ is None or class_ in el.get("class", ())):
+            return el
+    return None
+
+
+def _fragments(heading):
+    # str(tag) で HTML に戻すより速いので、ブロック内のタグ名・属性・文字列を文書順に並べたものをハッシュする
+    for el in section_elements(heading):
+        if isinstance(el, Tag):
+            yield f"<{el.name}{el.attrs}" if el.attrs else "<" + el.name
+        else:
+            yield el
+
+
+def section_hash(heading, salt=""):
+    """section_elements（parse_section が読んでよい範囲）の中身のハッシュ"""
+    serialized = "\x00".join(_fragments(heading))
+    normalized = _WHITESPACE.sub(" ", serialized).strip()
+    return hashlib.sha1((salt + normalized).encode("utf-8")).hexdigest()
+
+
+class SectionCache:
+    def __init__(self, name, version, entries=None):
+        self.name = name
+        self.version = version
+        self._previous = entries or {}
+        self._current = {}
+
+    @property
+    def entries(self):
+        """今回のページに現れたブロックの結果（次回の entries になる）"""
+        return self._current
+
+    @classmethod
+    def load(cls, name, version):
+        """保存済みのキャッシュを返す。無効なときは None（parse_sections は毎回パースする）"""
+        if not ENABLED or page_archive.replaying():
+            return None
+        try:
+            with open(os.path.join(SECTIONS_DIR, name + ".json"), "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            entries = {}
+        return cls(name, version, entries)
+
+    def parse(self, heading, parse_section, url):
+        key = section_hash(heading, f"{self.version}|{year_epoch()}|{url}|")
+        if key in self._current:
+            return self._current[key]
+        if key in self._previous:
+            metrics.inc("section_cache", result="hit")
+            record = self._previous[key]
+        else:
+            metrics.inc("section_cache", result="miss")
+            record = parse_section(heading)
+        self._current[key] = record
+        return record
+
+    def save(self):
+        # 今回のページにないブロックは捨てる（ファイルがページの大きさ以上に育たない）
+        os.makedirs(SECTIONS_DIR, exist_ok=True)
+        path = os.path.join(SECTIONS_DIR, self.name + ".json")
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+
+def parse_sections(soup, tag, parse_section, cache=None, url="", keep=None):
+    """soup の tag 見出しごとに parse_section(見出し) の結果（JSON にできる値）を返す
+
+    cache があれば、内容が前回と同じブロックは parse_section を呼ばずに前回の結果を返す。
+    keep(見出し) が偽の見出しは、パースもキャッシュもせずに飛ばす。
+    """
+    headings = soup.find_all(tag)
+    if keep is not None:
+        headings = [heading for heading in headings if keep(heading)]
+    if cache is None:
+        return [parse_section(heading) for heading in headings]
+    return [cache.parse(heading, parse_section, url) for heading in headings]
@@ -1,12 +1,54 @@
 # src/lib/supabase_client.py
+#
+# Supabase クライアントは最初に使うときに作って使い回す
+# import しただけでは環境変数を読まず、supabase パッケージも読み込まない
+# （テスト・ベンチマーク・dry-run でスクレイパーを import しても DB 接続のコストがかからない）
+#   get_supabase(): SUPABASE_URL / SUPABASE_KEY から作る
+#   get_supabase(env_file): .env ファイルの値で作る（m_ スクリプトの .env.test 用）
+#   from src.lib.supabase_client import supabase も従来どおり使える（その時点で作る）
 
 import os
-from supabase import create_client
+import threading
 
-url = os.environ.get("SUPABASE_URL")
-key = os.environ.get("SUPABASE_KEY")
+_clients = {}
+_lock = threading.Lock()
 
-if not url or not key:
-    raise ValueError("環境変数 SUPABASE_URL または SUPABASE_KEY が未設定です")
 
-supabase = create_client(url, key)
+def _credentials(env_file, override):
+    url = os.environ.get("SUPABASE_URL")
+    key = os.environ.get("SUPABASE_KEY")
+    if env_file:
+        from dotenv import dotenv_values
+
+        # os.environ は書き換えず、ファイルの値だけを読む
+        values = dotenv_values(env_file)
+        if override:
+            url, key = values.get("SUPABASE_URL") or url, values.get("SUPABASE_KEY") or key
+        else:
+            url, key = url or values.get("SUPABASE_URL"), key or values.get("SUPABASE_KEY")
+        print("✅ URL =", url)
+        print("✅ KEY =", "[OK]" if key else "[MISSING]")
+    return url, key
+
+
+def get_supabase(env_file=None, override=False):
+    """Supabase クライアントを返す。env_file を指定するとそのファイルの値を使う
+
+    override=False なら環境変数を優先し、足りない値だけ env_file から補う。
+    """
+    with _lock:
+        client = _clients.get((env_file, override))
+        if client is None:
+            url, key = _credentials(env_file, override)
+            if not url or not key:
+                raise ValueError("環境変数 SUPABASE_URL または SUPABASE_KEY が未設定です")
+            from supabase import create_client
+
+            client = _clients[(env_file, override)] = create_client(url, key)
+        return client
+
+
+def __getattr__(name):
+    if name == "supabase":
+        return get_supabase()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,47 @@
+# src/lib/text_utils.py
+#
+# スクレイパー共通のテキスト正規化
+#  - clean_text: NFKC 正規化と空白の圧縮（タイトルなど短い文字列は結果をキャッシュ）
+#  - remove_duplicate_sentences: 正規化済みの文章から重複した文を 1 回の走査で除く
+#  - clean_description: 上の 2 つをまとめたもの（正規化は 1 回だけ）
+
+import re
+import unicodedata
+from functools import lru_cache
+
+# NFKC 後は「！？」が「!?」になるので両方で区切る
+_SENTENCE_END = re.compile(r"(?<=[。!?！？])\s*")
+_WHITESPACE = re.compile(r"\s+")
+CACHED_TEXT_LENGTH = 200
+
+
+def _clean(text):
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+_clean_cached = lru_cache(maxsize=8192)(_clean)
+
+
+def clean_text(text):
+    if not text:
+        return ""
+    # 毎回同じものが来るタイトル等だけをキャッシュし、長い説明文でキャッシュを埋めない
+    if len(text) <= CACHED_TEXT_LENGTH:
+        return _clean_cached(text)
+    return _clean(text)
+
+
+def remove_duplicate_sentences(text):
+    """clean_text 済みの text から 2 回目以降に現れた同じ文を除く"""
+    seen = set()
+    unique_sentences = []
+    for sentence in _SENTENCE_END.split(text):
+        sentence = sentence.strip()
+        if sentence and sentence not in seen:
+            seen.add(sentence)
+            unique_sentences.append(sentence)
+    return " ".join(unique_sentences)
+
+
+def clean_description(text):
+    return remove_duplicate_sentences(clean_text(text))
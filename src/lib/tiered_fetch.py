@@ -0,0 +1,108 @@
+# src/lib/tiered_fetch.py
+#
+# JS で描画しているか分からないページ用の段階的な取得
+#  1. まず普通の HTTP GET で取得し、スクレイパーが必要とするセレクタがあるか確かめる
+#     （check を渡すと、要素があるだけでなく中身も確かめる。JS が埋める空の枠だけのページをはじく）
+#  2. なければ（または取得に失敗したら）BrowserPool の Chromium で取得し直す
+# URL ごとにうまくいった段階を .cache/tiers/ に覚えておき、次回は最初からその段階で取得する
+# ブラウザが必要だったページも REPROBE_DAYS ごとに HTTP を試し直す（サイトの作りが変わることがあるため）
+# HTTP で足りていたページも、毎回 selector / check を確かめ、足りなくなればブラウザに切り替えて覚え直す
+
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlsplit
+
+from src.lib import metrics, page_archive
+from src.lib.browser_pool import get_browser_pool
+from src.lib.html_parser import parse_html
+from src.lib.http_client import fetch
+
+BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+CACHE_DIR = os.environ.get("SCRAPER_CACHE_DIR", os.path.join(BASE_DIR, ".cache"))
+TIER_DIR = os.path.join(CACHE_DIR, "tiers")
+REPROBE_DAYS = int(os.environ.get("FETCH_TIER_REPROBE_DAYS", "7"))
+TIERS = ("http", "browser")
+
+_lock = threading.Lock()
+
+
+def _entry_path(url):
+    return os.path.join(TIER_DIR, hashlib.sha1(url.encode("utf-8")).hexdigest() + ".json")
+
+
+def load_tier(url):
+    """前回うまくいった段階（"http" / "browser"）。記録がない・再確認の時期なら None"""
+    try:
+        with open(_entry_path(url), "r", encoding="utf-8") as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if entry.get("tier") == "browser":
+        checked = datetime.fromisoformat(entry["checked_at"])
+        if datetime.now(timezone.utc) - checked >= timedelta(days=REPROBE_DAYS):
+            return None
+    return entry.get("tier")
+
+
+def save_tier(url, tier):
+    # replay では実サイトの作りを確かめていないので記録しない
+    if page_archive.replaying():
+        return
+    path = _entry_path(url)
+    entry = {"url": url, "tier": tier, "checked_at": datetime.now(timezone.utc).isoformat()}
+    with _lock:
+        os.makedirs(TIER_DIR, exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+
+def has_selector(html, selector, check=None):
+    """selector の最初の要素があり、check(要素) が真か（check がなければ要素があるだけでよい）"""
+    el = parse_html(html).select_one(selector)
+    return el is not None and (check is None or bool(check(el)))
+
+
+def _try_http(url, selector, user_agent, check=None):
+    headers = {"User-Agent": user_agent} if user_agent else None
+    try:
+        res = fetch(url, headers=headers)
+        res.raise_for_status()
+    except Exception as e:
+        print(f"⚠️ HTTP 取得失敗 → ブラウザで取得: {url} ({e.__class__.__name__})")
+        return None
+    html = res.text
+    if not has_selector(html, selector, check):
+        what = selector if check is None else f"中身のある {selector}"
+        print(f"🔁 HTTP の HTML に {what} がない → ブラウザで取得: {url}")
+        return None
+    return html
+
+
+def fetch_html(url, selector, user_agent=None, owner=None, check=None, **browser_options):
+    """selector を含む HTML を返す。HTTP で足りればブラウザを起動しない
+
+    check（selector の要素を受け取る関数）を渡すと、HTTP の HTML はその要素の中身が check を満たすときだけ使う。
+    browser_options（wait_until / timeout / policy）はブラウザで取得するときだけ使う。
+    selector はブラウザ側では wait_for として待つ。
+    """
+    host = urlsplit(url).netloc
+    tier = load_tier(url)
+    if tier != "browser":
+        html = _try_http(url, selector, user_agent, check)
+        if html is not None:
+            if tier != "http":
+                save_tier(url, "http")
+            metrics.inc("tier_fetches", tier="http", host=host)
+            return html
+        metrics.inc("tier_escalations", host=host)
+
+    html = get_browser_pool().fetch_html(url, wait_for=selector, user_agent=user_agent, owner=owner, **browser_options)
+    if tier != "browser":
+        save_tier(url, "browser")
+    metrics.inc("tier_fetches", tier="browser", host=host)
+    return html
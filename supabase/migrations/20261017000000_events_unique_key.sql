@@ -0,0 +1,13 @@
+-- events を (museum_id, title, start_date) で一意にし、スクレイパーの upsert 衝突キーにする
+
+-- 既存の重複行は 1 行だけ残して削除
+delete from events a
+  using events b
+  where a.museum_id = b.museum_id
+    and a.title = b.title
+    and a.start_date = b.start_date
+    and a.ctid < b.ctid;
+
+alter table events
+  add constraint events_museum_id_title_start_date_key
+  unique (museum_id, title, start_date);
@@ -0,0 +1,28 @@
+-- スクレイパーはタイトルを text_utils.clean_text（NFKC 正規化・空白の圧縮・前後の空白除去）で送るので、
+-- 既存行のタイトルも同じ形に揃える
+-- 揃えないと、一意制約 (museum_id, title, start_date) は生のタイトルを比べるので「（」と「(」などの違いで別の行が増え、
+-- event_sync の索引（正規化したキー）では同じイベントに見えるため、古い行が取り下げられずに残る
+
+create temporary table normalized_titles as
+  select id,
+         museum_id,
+         start_date,
+         btrim(regexp_replace(normalize(title, NFKC), '[[:space:]]+', ' ', 'g')) as title
+  from events;
+
+-- 正規化すると同じになる行は、新しい方（id の大きい行）だけを残す
+delete from events e
+  using normalized_titles a, normalized_titles b
+  where e.id = a.id
+    and a.museum_id = b.museum_id
+    and a.start_date = b.start_date
+    and a.title = b.title
+    and a.id < b.id;
+
+update events e
+  set title = n.title
+  from normalized_titles n
+  where e.id = n.id
+    and e.title <> n.title;
+
+drop table normalized_titles;
@@ -0,0 +1,9 @@
+-- 館のページから消えた今後のイベントに付ける取り下げ日時（スクレイパーの同期で設定し、再掲載されたら null に戻す）
+-- 行は消さずに残すので、誤判定でも次の同期で元に戻る
+
+alter table events
+  add column withdrawn_at timestamptz;
+
+create index events_museum_id_withdrawn_at_idx
+  on events (museum_id)
+  where withdrawn_at is null;